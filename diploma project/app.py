@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from flask import (
     Flask,
+    jsonify,
     request,
     redirect,
     session,
@@ -17,13 +18,17 @@ from ui_templates import (
     STUDENTS_PAGE,
     EDIT_PAGE,
     PREDICTION_PAGE,
+    ANALYTICS_PAGE,
 )
 
-from prediction_engine import predict
-from stats_manager import compute_stats, save_stats
-from history_manager import history
+from prediction_cache import prediction_cache
+from model_store import model_store
+from stats_manager import load_stats, stats_path_for
+from history_manager import HistoryManager
 from course_manager import course_manager
+from course_catalog import catalog
 from interventions import build_interventions
+from model_analytics import WINDOWS, analyze
 from trajectory_planner import build_two_plans
 
 
@@ -31,6 +36,7 @@ app = Flask(__name__)
 app.secret_key = "super_secret_key_123"
 
 db = Database()
+history = HistoryManager(db.path)
 
 
 # ------------------------------------------------------------
@@ -119,10 +125,7 @@ def add_student():
 
     name = request.form.get("name", "Student")
 
-    sid = db.add_student(session["user_id"], name)
-
-    db.ensure_catalog_ready()
-    course_manager.create_default_courses(sid)
+    db.add_student(session["user_id"], name)
 
     return redirect("/students")
 
@@ -139,8 +142,6 @@ def edit(sid: int):
     if not student:
         return "Student not found", 404
 
-    db.ensure_catalog_ready()
-    course_manager.create_default_courses(sid)
     courses = course_manager.get_student_courses(sid)
 
     if request.method == "POST":
@@ -155,18 +156,15 @@ def edit(sid: int):
                 except ValueError:
                     pass
 
-        if fields:
-            db.update_student(sid, **fields)
-
+        course_changes = []
         for c in courses:
-            row_id = c["id"]
-            enabled_flag = 1 if request.form.get(f"course_{row_id}_enabled") else 0
-            grade_raw = request.form.get(f"course_{row_id}_grade")
+            cid = c["course_id"]
+            enabled_flag = 1 if request.form.get(f"course_{cid}_enabled") else 0
+            grade_raw = request.form.get(f"course_{cid}_grade")
             grade_val = float(grade_raw) if grade_raw not in ("", None) else None
-            course_manager.update_course(row_id, enabled_flag, grade_val)
+            course_changes.append((cid, enabled_flag, grade_val))
 
-        db.ensure_catalog_ready()
-        course_manager.create_default_courses(sid)
+        db.update_student_with_courses(sid, fields, course_changes)
 
         return redirect("/students")
 
@@ -197,15 +195,9 @@ def do_predict(sid: int):
     if not student:
         return "Student not found", 404
 
-    db.ensure_catalog_ready()
-    course_manager.create_default_courses(sid)
-
-    courses = course_manager.get_student_courses(sid)
-
-    stats = compute_stats()
-    save_stats(stats)
-
-    p_initial, p_adjusted, weights = predict(student, courses)
+    p_initial, p_adjusted, weights = prediction_cache.predict(
+        student, lambda: course_manager.get_student_courses(sid)
+    )
 
     history.add_record(
         student_id=sid,
@@ -249,20 +241,16 @@ def trajectory(student_id: int):
     if not student:
         return "Student not found", 404
 
-    db.ensure_catalog_ready()
-    course_manager.create_default_courses(student_id)
-
     courses_taken = course_manager.get_student_courses(student_id)
 
-    p_initial, p_adjusted, weights = predict(student, courses_taken)
+    p_initial, p_adjusted, weights = prediction_cache.predict(student, lambda: courses_taken)
 
     base_ids, base_reason, rec_ids, rec_reason, risk = build_two_plans(courses_taken, p_adjusted)
 
-    all_courses = db.get_all_courses()
-    name_by_id = {int(c["id"]): c["name"] for c in all_courses}
+    courses_catalog = catalog.get()
 
-    base_plan = [{"id": cid, "name": name_by_id.get(cid, f"Course #{cid}")} for cid in base_ids]
-    rec_plan = [{"id": cid, "name": name_by_id.get(cid, f"Course #{cid}")} for cid in rec_ids]
+    base_plan = [{"id": cid, "name": courses_catalog.name(cid)} for cid in base_ids]
+    rec_plan = [{"id": cid, "name": courses_catalog.name(cid)} for cid in rec_ids]
 
     actions = build_interventions(student, courses_taken)
 
@@ -295,11 +283,8 @@ def trajectory_apply(student_id: int):
     if not student:
         return "Student not found", 404
 
-    db.ensure_catalog_ready()
-    course_manager.create_default_courses(student_id)
-
     courses_taken = course_manager.get_student_courses(student_id)
-    p_initial, p_adjusted, weights = predict(student, courses_taken)
+    p_initial, p_adjusted, weights = prediction_cache.predict(student, lambda: courses_taken)
 
     base_ids, base_reason, rec_ids, rec_reason, risk = build_two_plans(courses_taken, p_adjusted)
 
@@ -346,5 +331,38 @@ def trajectory_remove(student_id: int):
     return redirect(url_for("trajectory", student_id=student_id, semester=semester))
 
 
+# ------------------------------------------------------------
+# MODEL ANALYTICS
+# ------------------------------------------------------------
+@app.route("/analytics")
+def analytics():
+    if not logged_in():
+        return redirect("/login")
+
+    window = request.args.get("window", "month")
+    if window not in WINDOWS:
+        window = "month"
+
+    history.writer.flush()
+    report = analyze(db.path, window=window)
+    return render_template_string(ANALYTICS_PAGE, report=report, windows=WINDOWS)
+
+
+# ------------------------------------------------------------
+# METRICS
+# ------------------------------------------------------------
+@app.route("/metrics")
+def metrics():
+    if not logged_in():
+        return redirect("/login")
+
+    return jsonify({
+        "prediction_cache": prediction_cache.stats(),
+        "history_writer": history.writer.stats(),
+        "model": {"weights_version": model_store.sync()},
+        "param_stats": load_stats(stats_path_for(db.path)),
+    })
+
+
 if __name__ == "__main__":
     app.run(debug=True)
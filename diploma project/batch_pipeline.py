@@ -0,0 +1,844 @@
+import argparse
+import hashlib
+import io
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from connection_pool import get_pool
+
+# ------------------------------------------------------------
+# Batch Prediction Pipeline
+# ------------------------------------------------------------
+# The pipeline behind demo_main.py, as a reusable module:
+#   students.csv      - one row per student (Gcurrent, Gmin, Gmax, Ph,
+#                       optional actual_outcome); read whole
+#   attendance.csv    - Ar = weighted mean of attendance per student
+#   progress.csv      - Cp = weighted mean of progress per student
+#   lms_activity.csv  - Ls = min-max normalized activity score
+#
+# The three per-row files are streamed in chunks of CHUNK_SIZE rows;
+# only running sums per student_id are kept (WeightedSums), so memory
+# grows with the number of students, not with the size of the export.
+# Ga and P are computed with column arithmetic over the whole cohort.
+#
+# Each input may also be Parquet or Arrow instead of CSV (see File
+# formats below); so may the predictions output. With a state file
+# (--state) only rows appended since the previous run are read, see
+# Incremental mode.
+#
+# Usage: python batch_pipeline.py [--data-dir DIR] [--out FILE] [--chunk-size N]
+#                                  [--workers N] [--state [FILE]] [--full]
+#                                  [--format csv|parquet|arrow]
+# ------------------------------------------------------------
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+OUT_DIR = os.path.join(BASE_DIR, "results")
+OUT_PATH = os.path.join(OUT_DIR, "predictions.csv")
+
+CHUNK_SIZE = 100_000
+
+# Базові ваги
+WEIGHTS = {
+    "alpha": 0.35,
+    "beta": 0.25,
+    "gamma": 0.20,
+    "delta": 0.15,
+    "epsilon": 0.05
+}
+K_CORRECTION = 0.1
+
+
+class WeightedSums:
+    """
+    Running sum(weight * value) and sum(weight) per key.
+
+    Chunks are reduced with np.unique + np.bincount and kept as sorted
+    (keys, weighted, weights) arrays; pending chunks are merged into the
+    totals once they outgrow them, so adding a chunk stays cheap.
+    """
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.int64)
+        self.weighted = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self._pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._pending_rows = 0
+
+    def add(self, keys: np.ndarray, values: np.ndarray, weights: np.ndarray) -> None:
+        if keys.shape[0] == 0:
+            return
+        self.add_reduced(*_reduce(keys, weights * values, weights))
+
+    def add_reduced(self, keys: np.ndarray, weighted: np.ndarray, weights: np.ndarray) -> None:
+        """
+        Adds partial sums that are already one row per key.
+        """
+        self._pending.append((keys, weighted, weights))
+        self._pending_rows += keys.shape[0]
+        if self._pending_rows > max(CHUNK_SIZE, self.keys.shape[0]):
+            self._compact()
+
+    @classmethod
+    def from_arrays(cls, keys: np.ndarray, weighted: np.ndarray, weights: np.ndarray) -> "WeightedSums":
+        """
+        Wraps totals that are already sorted by key and one row per key.
+        """
+        sums = cls()
+        sums.keys, sums.weighted, sums.weights = keys, weighted, weights
+        return sums
+
+    def merge(self, other: "WeightedSums") -> None:
+        self.add_reduced(*other.arrays())
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        self._compact()
+        return self.keys, self.weighted, self.weights
+
+    def mean(self) -> pd.Series:
+        """
+        Weighted mean per key; keys whose weights sum to 0 get 0.
+        """
+        keys, weighted, weights = self.arrays()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = np.where(weights != 0, weighted / weights, 0.0)
+        return pd.Series(result, index=pd.Index(keys, name="student_id"))
+
+    def _compact(self) -> None:
+        if not self._pending:
+            return
+        parts = [(self.keys, self.weighted, self.weights)] + self._pending
+        self._pending = []
+        self._pending_rows = 0
+        self.keys, self.weighted, self.weights = _reduce(
+            np.concatenate([p[0] for p in parts]),
+            np.concatenate([p[1] for p in parts]),
+            np.concatenate([p[2] for p in parts]),
+        )
+
+
+def _reduce(keys: np.ndarray, weighted: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return (
+        unique,
+        np.bincount(inverse, weights=weighted, minlength=unique.shape[0]),
+        np.bincount(inverse, weights=weights, minlength=unique.shape[0]),
+    )
+
+
+def _numeric(frame: pd.DataFrame, column: str) -> np.ndarray:
+    return pd.to_numeric(frame[column], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+
+
+def _ids(frame: pd.DataFrame) -> np.ndarray:
+    return _numeric(frame, "student_id").astype(np.int64)
+
+
+# ------------------------------------------------------------
+# File formats
+# ------------------------------------------------------------
+# The format follows the file extension: CSV, Parquet (.parquet, .pq)
+# or Arrow IPC / Feather v2 (.arrow, .feather). Columnar files are read
+# with column projection, one row group / record batch at a time, and
+# keep their dtypes. pyarrow is only imported once such a file is used.
+# ------------------------------------------------------------
+FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+}
+# Extensions an input may have in the data directory. An input present
+# in more than one of them is an error unless a format is chosen.
+INPUT_EXTENSIONS = (".parquet", ".pq", ".arrow", ".feather", ".csv")
+
+
+def file_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        return FORMATS[ext]
+    except KeyError:
+        raise ValueError(f"Unsupported file type: {path}") from None
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet / Arrow files need pyarrow (pip install pyarrow)") from None
+    return pyarrow
+
+
+def find_input(data_dir: str, name: str, input_format: Optional[str] = None) -> str:
+    """
+    data_dir/name with the extension from INPUT_EXTENSIONS that exists.
+    If the input exists in several formats, input_format ("csv",
+    "parquet" or "arrow") picks one; without it that is a ValueError,
+    so a stale export in another format is never read silently.
+    """
+    if input_format is not None and input_format not in FORMATS.values():
+        raise ValueError(f"Unknown input format: {input_format}")
+
+    found = [
+        path for path in (os.path.join(data_dir, name + ext) for ext in INPUT_EXTENSIONS)
+        if os.path.exists(path)
+    ]
+    if not found:
+        raise FileNotFoundError(f"No {name} input ({', '.join(INPUT_EXTENSIONS)}) in {data_dir}")
+    if len(found) > 1 and input_format is not None:
+        found = [path for path in found if file_format(path) == input_format] or found
+    if len(found) > 1:
+        names = ", ".join(os.path.basename(p) for p in found)
+        hint = "" if input_format is not None else " (choose one with --format)"
+        raise ValueError(f"Several {name} inputs in {data_dir}: {names}{hint}")
+    return found[0]
+
+
+def _columnar_units(path: str) -> List[int]:
+    """
+    Row counts of the row groups (Parquet) or record batches (Arrow) of a file.
+    """
+    pa = _pyarrow()
+    if file_format(path) == "parquet":
+        metadata = pa.parquet.ParquetFile(path).metadata
+        return [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        return [reader.get_batch(i).num_rows for i in range(reader.num_record_batches)]
+
+
+def _iter_columnar(path: str, columns: List[str], chunk_size: int, units: Optional[List[int]]):
+    pa = _pyarrow()
+    if file_format(path) == "parquet":
+        pf = pa.parquet.ParquetFile(path)
+        for batch in pf.iter_batches(batch_size=chunk_size, columns=columns, row_groups=units):
+            yield batch.to_pandas()
+        return
+
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches) if units is None else units:
+            batch = reader.get_batch(i).select(columns)
+            for start in range(0, batch.num_rows, chunk_size):
+                yield batch.slice(start, chunk_size).to_pandas()
+
+
+def iter_chunks(path: str, columns: List[str], chunk_size: int = CHUNK_SIZE, units: Optional[List[int]] = None):
+    """
+    Yields DataFrame chunks with only the given columns. For columnar
+    files, units limits reading to those row groups / record batches.
+    """
+    if file_format(path) == "csv":
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+    else:
+        yield from _iter_columnar(path, columns, chunk_size, units)
+
+
+def read_frame(path: str) -> pd.DataFrame:
+    if file_format(path) == "csv":
+        return pd.read_csv(path)
+    pa = _pyarrow()
+    if file_format(path) == "parquet":
+        return pa.parquet.read_table(path).to_pandas()
+    return pa.feather.read_table(path).to_pandas()
+
+
+def write_frame(df: pd.DataFrame, path: str) -> None:
+    fmt = file_format(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+        return
+    pa = _pyarrow()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if fmt == "parquet":
+        pa.parquet.write_table(table, path)
+    else:
+        pa.feather.write_feather(table, path)
+
+
+# ------------------------------------------------------------
+# Parallel mode
+# ------------------------------------------------------------
+# Weighted sums merge by addition, so rows can be split in any way.
+# CSV files are cut into byte ranges aligned to line starts, columnar
+# files into runs of row groups / record batches; each worker parses
+# only its own shard and returns (keys, weighted, weights,
+# min, max) as NumPy arrays, and the parent adds the partial sums.
+# ------------------------------------------------------------
+BLOCK_BYTES = 64 * 1024 * 1024
+MIN_SHARD_BYTES = 4 * 1024 * 1024
+
+
+def byte_ranges(path: str, parts: int, start: Optional[int] = None, end: Optional[int] = None) -> List[Tuple[int, int]]:
+    """
+    Splits the data rows of a CSV file (after the header line, or the
+    line-aligned bytes start..end) into at most parts (start, end)
+    ranges that begin and end on line starts.
+    """
+    size = os.path.getsize(path) if end is None else end
+    with open(path, "rb") as f:
+        f.readline()
+        first = f.tell() if start is None else start
+        step = max((size - first) // max(parts, 1), 1)
+        bounds = [first]
+        for offset in range(first + step, size, step):
+            if offset <= bounds[-1]:
+                continue
+            f.seek(offset - 1)
+            f.readline()
+            if f.tell() >= size:
+                break
+            if f.tell() > bounds[-1]:
+                bounds.append(f.tell())
+        bounds.append(size)
+    return [(lo, hi) for lo, hi in zip(bounds, bounds[1:]) if hi > lo]
+
+
+def _iter_range_frames(path: str, start: int, end: int, names: List[str], columns: List[str],
+                       block_bytes: int = BLOCK_BYTES):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while f.tell() < end:
+            block = f.read(min(block_bytes, end - f.tell()))
+            if f.tell() < end and not block.endswith(b"\n"):
+                block += f.readline()
+            if not block.strip():
+                continue
+            yield pd.read_csv(io.BytesIO(block), header=None, names=names, usecols=columns)
+
+
+def _aggregate_frames(frames, value_column: str, weight_column: Optional[str]) -> Tuple[WeightedSums, float, float]:
+    sums = WeightedSums()
+    lo, hi = np.inf, -np.inf
+    for frame in frames:
+        values = _numeric(frame, value_column)
+        if values.shape[0]:
+            lo = min(lo, float(values.min()))
+            hi = max(hi, float(values.max()))
+        weights = _numeric(frame, weight_column) if weight_column else np.ones_like(values)
+        sums.add(_ids(frame), values, weights)
+    return sums, lo, hi
+
+
+def shards(path: str, parts: int) -> list:
+    """
+    Byte ranges for CSV, lists of row group / record batch indices otherwise.
+    """
+    if file_format(path) == "csv":
+        return byte_ranges(path, parts)
+    units = np.array_split(np.arange(len(_columnar_units(path))), parts)
+    return [u.tolist() for u in units if u.shape[0]]
+
+
+def _aggregate_shard(path: str, shard, names: Optional[List[str]], value_column: str,
+                     weight_column: Optional[str], chunk_size: int):
+    columns = ["student_id", value_column] + ([weight_column] if weight_column else [])
+    if names is not None:
+        frames = _iter_range_frames(path, shard[0], shard[1], names, columns)
+    else:
+        frames = iter_chunks(path, columns, chunk_size, units=shard)
+    sums, lo, hi = _aggregate_frames(frames, value_column, weight_column)
+    return (*sums.arrays(), lo, hi)
+
+
+def aggregate(path: str, value_column: str, weight_column: Optional[str] = "weight",
+              chunk_size: int = CHUNK_SIZE, workers: int = 1) -> Tuple[WeightedSums, float, float]:
+    """
+    Per-student sum(weight * value) and sum(weight) over an input file,
+    plus the min and max of value over all rows. Without weight_column
+    every row has weight 1. workers > 1 shards the file across a
+    process pool (0 = one worker per CPU); small files stay serial.
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, os.path.getsize(path) // MIN_SHARD_BYTES)
+
+    if workers <= 1:
+        columns = ["student_id", value_column] + ([weight_column] if weight_column else [])
+        return _aggregate_frames(iter_chunks(path, columns, chunk_size), value_column, weight_column)
+
+    names = list(pd.read_csv(path, nrows=0).columns) if file_format(path) == "csv" else None
+    return _aggregate_parallel(path, shards(path, workers), names, value_column, weight_column, chunk_size, workers)
+
+
+def _aggregate_parallel(path: str, shard_list: list, names: Optional[List[str]], value_column: str,
+                        weight_column: Optional[str], chunk_size: int, workers: int) -> Tuple[WeightedSums, float, float]:
+    sums = WeightedSums()
+    lo, hi = np.inf, -np.inf
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_aggregate_shard, path, shard, names, value_column, weight_column, chunk_size)
+            for shard in shard_list
+        ]
+        for future in futures:
+            keys, weighted, weights, part_lo, part_hi = future.result()
+            sums.add_reduced(keys, weighted, weights)
+            lo, hi = min(lo, part_lo), max(hi, part_hi)
+    return sums, lo, hi
+
+
+def weighted_mean(path: str, value_column: str, chunk_size: int = CHUNK_SIZE, workers: int = 1) -> pd.Series:
+    """
+    sum(weight * value) / sum(weight) per student over a file with
+    student_id, value_column and weight columns; missing values count as 0.
+    """
+    sums, _, _ = aggregate(path, value_column, "weight", chunk_size, workers)
+    return sums.mean()
+
+
+def activity_scores(path: str, chunk_size: int = CHUNK_SIZE, workers: int = 1) -> pd.Series:
+    """
+    Ls per student: mean activity_score of the student's rows, min-max
+    normalized over all rows (0.5 when every score is the same).
+    """
+    return _activity_from(*aggregate(path, "activity_score", None, chunk_size, workers))
+
+
+def _activity_from(sums: WeightedSums, lo: float, hi: float) -> pd.Series:
+    mean = sums.mean()
+    if lo == hi:
+        return pd.Series(0.5, index=mean.index)
+    return ((mean - lo) / (hi - lo)).clip(0, 1)
+
+
+# ------------------------------------------------------------
+# Incremental mode
+# ------------------------------------------------------------
+# The state file (SQLite) keeps, per input, a high-water mark - the
+# byte offset after the last complete CSV line read (a trailing row
+# without a newline waits for the next run), or the number of rows read
+# from a columnar one - and the per-student partial sums and value
+# min / max up to that mark. A run reads only what lies past the mark,
+# adds it to the stored sums (touching only the students that appear
+# in the new rows) and moves the mark. An input that shrank, changed
+# path, or whose rows before the mark look different (rewritten rather
+# than appended) is recomputed in full, as is every input with --full.
+#
+# Limits of that check: for CSV only the first bytes and the bytes just
+# before the mark are compared, so edits in the middle of the file need
+# --full. For Parquet, whole row groups before the mark are compared by
+# row count and min / max / null statistics, so a re-export that
+# changes values without changing any of those needs --full as well;
+# Arrow rows before the mark and the last Parquet row group before it
+# are compared by content.
+# ------------------------------------------------------------
+STATE_PATH = os.path.join(OUT_DIR, "batch_state.db")
+STATE_VERSION = 1
+FINGERPRINT_BYTES = 4096
+
+STATE_SCHEMA = [
+    """
+    CREATE TABLE batch_inputs (
+        name TEXT PRIMARY KEY,
+        path TEXT NOT NULL,
+        watermark INTEGER NOT NULL,
+        fingerprint TEXT NOT NULL,
+        lo REAL,
+        hi REAL,
+        updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+    """
+    CREATE TABLE batch_sums (
+        input TEXT NOT NULL,
+        student_id INTEGER NOT NULL,
+        weighted REAL NOT NULL,
+        weight REAL NOT NULL,
+        PRIMARY KEY (input, student_id)
+    ) WITHOUT ROWID;
+    """,
+]
+
+UPSERT_SUMS_SQL = """
+INSERT INTO batch_sums (input, student_id, weighted, weight) VALUES (?, ?, ?, ?)
+ON CONFLICT (input, student_id) DO UPDATE SET
+    weighted = weighted + excluded.weighted,
+    weight = weight + excluded.weight;
+"""
+
+SAVE_INPUT_SQL = """
+INSERT INTO batch_inputs (name, path, watermark, fingerprint, lo, hi, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+ON CONFLICT (name) DO UPDATE SET
+    path = excluded.path,
+    watermark = excluded.watermark,
+    fingerprint = excluded.fingerprint,
+    lo = excluded.lo,
+    hi = excluded.hi,
+    updated_at = excluded.updated_at;
+"""
+
+
+def open_state(path: str = STATE_PATH):
+    """
+    Connection pool for the state file; tables from another
+    STATE_VERSION are dropped and recreated (a full recompute).
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    pool = get_pool(path)
+    with pool.transaction() as conn:
+        if conn.execute("PRAGMA user_version;").fetchone()[0] != STATE_VERSION:
+            conn.execute("DROP TABLE IF EXISTS batch_inputs;")
+            conn.execute("DROP TABLE IF EXISTS batch_sums;")
+            for sql in STATE_SCHEMA:
+                conn.execute(sql)
+            conn.execute(f"PRAGMA user_version = {STATE_VERSION};")
+    return pool
+
+
+def _header_end(path: str) -> int:
+    with open(path, "rb") as f:
+        f.readline()
+        return f.tell()
+
+
+def _complete_end(path: str, start: int) -> int:
+    """
+    Offset just after the last newline at or after start (start if
+    there is none). A trailing row without a newline may still be
+    being written; it is left for the next run.
+    """
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        while pos > start:
+            step = min(FINGERPRINT_BYTES, pos - start)
+            f.seek(pos - step)
+            i = f.read(step).rfind(b"\n")
+            if i >= 0:
+                return pos - step + i + 1
+            pos -= step
+    return start
+
+
+def _hash_rows(h, batch) -> None:
+    # Hashes values, not the IPC encoding, which differs for slices.
+    h.update(pd.util.hash_pandas_object(batch.to_pandas(), index=False).to_numpy().tobytes())
+
+
+def _columnar_fingerprint(h, path: str, watermark: int) -> None:
+    """
+    Parquet / Arrow files are rewritten, not appended in place, so the
+    rows before the mark are checked on every run. Parquet: per row
+    group the row count and min / max / null statistics, or the rows
+    themselves where a column has no statistics; the last row group
+    before the mark is always hashed by its rows up to the mark, so it
+    hashes the same once rows are appended to it. Arrow: all rows up to
+    the mark.
+    """
+    pa = _pyarrow()
+    counts = _columnar_units(path)
+
+    if file_format(path) == "parquet":
+        pf = pa.parquet.ParquetFile(path)
+        h.update(",".join(pf.schema_arrow.names).encode())
+        metadata = pf.metadata
+        before = 0
+        for i, n in enumerate(counts):
+            if before >= watermark:
+                break
+            take = min(n, watermark - before)
+            before += n
+            rg = metadata.row_group(i)
+            columns = [rg.column(j) for j in range(rg.num_columns)]
+            if before < watermark and all(c.is_stats_set and c.statistics.has_min_max for c in columns):
+                # Encoded sizes are left out: they vary between writes of the same rows.
+                h.update(repr((i, n, [
+                    (c.statistics.min, c.statistics.max, c.statistics.null_count) for c in columns
+                ])).encode())
+            else:
+                h.update(repr((i, take)).encode())
+                _hash_rows(h, pf.read_row_group(i).slice(0, take))
+        return
+
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        h.update(",".join(reader.schema.names).encode())
+        before = 0
+        for i, n in enumerate(counts):
+            if before >= watermark:
+                break
+            take = min(n, watermark - before)
+            before += n
+            # Row hashes only, so re-batching the same rows changes nothing.
+            _hash_rows(h, reader.get_batch(i).slice(0, take))
+
+
+def _fingerprint(path: str, watermark: int) -> str:
+    """
+    Hash of the CSV header and the FINGERPRINT_BYTES after it and
+    before the mark (edits in between go unnoticed and need --full);
+    for columnar files see _columnar_fingerprint.
+    """
+    h = hashlib.sha1()
+    if file_format(path) != "csv":
+        _columnar_fingerprint(h, path, watermark)
+        return h.hexdigest()
+
+    with open(path, "rb") as f:
+        h.update(f.readline())
+        first = f.tell()
+        h.update(f.read(max(min(FINGERPRINT_BYTES, watermark - first), 0)))
+        start = max(first, watermark - FINGERPRINT_BYTES)
+        f.seek(start)
+        h.update(f.read(max(watermark - start, 0)))
+    return h.hexdigest()
+
+
+def _iter_columnar_tail(path: str, columns: List[str], row_offset: int, chunk_size: int):
+    """
+    Chunks of a columnar file from row row_offset on.
+    """
+    counts = _columnar_units(path)
+    skip = row_offset
+    first = 0
+    while first < len(counts) and skip >= counts[first]:
+        skip -= counts[first]
+        first += 1
+    if first == len(counts):
+        return
+
+    for frame in _iter_columnar(path, columns, chunk_size, list(range(first, len(counts)))):
+        if skip >= len(frame):
+            skip -= len(frame)
+            continue
+        if skip:
+            frame, skip = frame.iloc[skip:], 0
+        yield frame
+
+
+def _aggregate_tail(path: str, start: int, end: int, value_column: str, weight_column: Optional[str],
+                    chunk_size: int, workers: int) -> Tuple[WeightedSums, float, float]:
+    columns = ["student_id", value_column] + ([weight_column] if weight_column else [])
+    if file_format(path) != "csv":
+        return _aggregate_frames(_iter_columnar_tail(path, columns, start, chunk_size), value_column, weight_column)
+
+    names = list(pd.read_csv(path, nrows=0).columns)
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, (end - start) // MIN_SHARD_BYTES)
+    if workers > 1:
+        return _aggregate_parallel(path, byte_ranges(path, workers, start, end), names,
+                                   value_column, weight_column, chunk_size, workers)
+    frames = _iter_range_frames(path, start, end, names, columns)
+    return _aggregate_frames(frames, value_column, weight_column)
+
+
+def update_input(pool, name: str, path: str, value_column: str, weight_column: Optional[str] = "weight",
+                 chunk_size: int = CHUNK_SIZE, workers: int = 1,
+                 full: bool = False) -> Tuple[WeightedSums, float, float, Dict[str, Any]]:
+    """
+    Brings the stored sums of one input up to date with the file and
+    returns (all sums, lo, hi, info) like aggregate() over the whole file.
+    """
+    path = os.path.abspath(path)
+    is_csv = file_format(path) == "csv"
+    end = _complete_end(path, _header_end(path)) if is_csv else sum(_columnar_units(path))
+
+    with pool.connection() as conn:
+        row = conn.execute("SELECT * FROM batch_inputs WHERE name = ?;", (name,)).fetchone()
+
+    incremental = (
+        not full
+        and row is not None
+        and row["path"] == path
+        and row["watermark"] <= end
+        and row["fingerprint"] == _fingerprint(path, row["watermark"])
+    )
+    if incremental:
+        start = row["watermark"]
+        lo = np.inf if row["lo"] is None else row["lo"]
+        hi = -np.inf if row["hi"] is None else row["hi"]
+    else:
+        start = _header_end(path) if is_csv else 0
+        lo, hi = np.inf, -np.inf
+
+    if start < end:
+        delta, delta_lo, delta_hi = _aggregate_tail(path, start, end, value_column, weight_column, chunk_size, workers)
+        lo, hi = min(lo, delta_lo), max(hi, delta_hi)
+    else:
+        delta = WeightedSums()
+    keys, weighted, weights = delta.arrays()
+
+    with pool.transaction() as conn:
+        if not incremental:
+            conn.execute("DELETE FROM batch_sums WHERE input = ?;", (name,))
+        conn.executemany(
+            UPSERT_SUMS_SQL,
+            zip(itertools.repeat(name), keys.tolist(), weighted.tolist(), weights.tolist()),
+        )
+        conn.execute(SAVE_INPUT_SQL, (
+            name, path, end, _fingerprint(path, end),
+            float(lo) if np.isfinite(lo) else None,
+            float(hi) if np.isfinite(hi) else None,
+        ))
+
+        cur = conn.cursor()
+        cur.row_factory = None
+        stored = cur.execute(
+            "SELECT student_id, weighted, weight FROM batch_sums WHERE input = ? ORDER BY student_id;", (name,)
+        ).fetchall()
+
+    arr = np.array(stored, dtype=np.float64).reshape(-1, 3)
+    sums = WeightedSums.from_arrays(arr[:, 0].astype(np.int64), arr[:, 1], arr[:, 2])
+    info = {
+        "mode": ("incremental" if start < end else "unchanged") if incremental else "full",
+        "read": end - start,
+        "unit": "bytes" if is_csv else "rows",
+        "students_updated": int(keys.shape[0]),
+    }
+    return sums, lo, hi, info
+
+
+def load_students(path: str) -> pd.DataFrame:
+    students = read_frame(path)
+    students = students.drop_duplicates(subset=["student_id"]).set_index("student_id")
+    students = students.fillna(students.mean())
+
+    gcur, gmin, gmax = (students[c].to_numpy(dtype=np.float64) for c in ("Gcurrent", "Gmin", "Gmax"))
+    span = gmax - gmin
+    with np.errstate(divide="ignore", invalid="ignore"):
+        students["Ga"] = np.where(span == 0, 0.5, (gcur - gmin) / span)
+    students["Ph"] = students["Ph"].fillna(0.5)
+    return students
+
+
+def compute_P(df: pd.DataFrame, w: Dict[str, float]) -> np.ndarray:
+    P = (w["alpha"] * df["Ga"].to_numpy() +
+         w["beta"] * df["Ar"].to_numpy() +
+         w["gamma"] * df["Cp"].to_numpy() +
+         w["delta"] * df["Ls"].to_numpy() +
+         w["epsilon"] * df["Ph"].to_numpy())
+    return np.clip(P, 0.0, 1.0)
+
+
+def adjust_weights(df: pd.DataFrame, actual: pd.Series,
+                   weights: Dict[str, float] = WEIGHTS, k: float = K_CORRECTION) -> Dict[str, float]:
+    """
+    Scales alpha and beta by 1 + k * corr(error, Ga / Ar) and renormalizes.
+    """
+    error = actual - df["P_pred_initial"]
+    # A constant column has no correlation (NaN), treated as 0 below.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        deltaG = error.corr(df["Ga"])
+        deltaA = error.corr(df["Ar"])
+    deltaG = 0 if pd.isna(deltaG) else deltaG
+    deltaA = 0 if pd.isna(deltaA) else deltaA
+
+    raw = {
+        "alpha": weights["alpha"] * (1 + k * deltaG),
+        "beta": weights["beta"] * (1 + k * deltaA),
+        "gamma": weights["gamma"],
+        "delta": weights["delta"],
+        "epsilon": weights["epsilon"]
+    }
+    s = sum(raw.values())
+    return {key: raw[key] / s for key in raw}
+
+
+class PipelineResult(NamedTuple):
+    predictions: pd.DataFrame
+    adjusted: Optional[Dict[str, float]]
+    timings: Dict[str, float]
+    # per input update info in incremental mode, see update_input
+    inputs: Dict[str, Dict[str, Any]]
+
+
+def run(data_dir: str = DATA_DIR, out_path: Optional[str] = OUT_PATH,
+        chunk_size: int = CHUNK_SIZE, weights: Dict[str, float] = WEIGHTS, workers: int = 1,
+        state_path: Optional[str] = None, full: bool = False,
+        input_format: Optional[str] = None) -> PipelineResult:
+    """
+    Scores every student in data_dir and writes the predictions to
+    out_path (unless it is None), in the format of its extension.
+    With state_path, attendance / progress / LMS activity are updated
+    incrementally from the state file. input_format picks the inputs
+    when data_dir holds more than one format (see find_input).
+    """
+    started = time.perf_counter()
+    students = load_students(find_input(data_dir, "students", input_format))
+
+    inputs: Dict[str, Dict[str, Any]] = {}
+    if state_path is None:
+        ar = weighted_mean(find_input(data_dir, "attendance", input_format), "attendance", chunk_size, workers)
+        cp = weighted_mean(find_input(data_dir, "progress", input_format), "progress", chunk_size, workers)
+        ls = activity_scores(find_input(data_dir, "lms_activity", input_format), chunk_size, workers)
+    else:
+        pool = open_state(state_path)
+        features = []
+        for name, value_column, weight_column in (
+            ("attendance", "attendance", "weight"),
+            ("progress", "progress", "weight"),
+            ("lms_activity", "activity_score", None),
+        ):
+            sums, lo, hi, inputs[name] = update_input(
+                pool, name, find_input(data_dir, name, input_format), value_column, weight_column,
+                chunk_size, workers, full,
+            )
+            features.append(sums.mean() if weight_column else _activity_from(sums, lo, hi))
+        ar, cp, ls = features
+    ar, cp, ls = ar.rename("Ar"), cp.rename("Cp"), ls.rename("Ls")
+    loaded = time.perf_counter()
+
+    df = students[["Ga", "Ph"]].join(ar, how="left").join(cp, how="left").join(ls, how="left")
+    df = df.fillna(0)
+    df["P_pred_initial"] = compute_P(df, weights)
+
+    adjusted = None
+    if "actual_outcome" in students.columns:
+        adjusted = adjust_weights(df, students["actual_outcome"], weights)
+        df["P_pred_adjusted"] = compute_P(df, adjusted)
+    scored = time.perf_counter()
+
+    if out_path is not None:
+        write_frame(df.reset_index(), out_path)
+
+    return PipelineResult(df, adjusted, {"load_s": loaded - started, "score_s": scored - loaded}, inputs)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Score students from the CSV / Parquet / Arrow exports")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="directory with the four input files")
+    parser.add_argument("--out", default=OUT_PATH, help="predictions file to write (.csv, .parquet or .arrow)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows read per chunk")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes per input file (0 = one per CPU, 1 = serial)")
+    parser.add_argument("--state", nargs="?", const=STATE_PATH, default=None,
+                        help=f"read only rows appended since the last run, keeping state in this file "
+                             f"(default {STATE_PATH})")
+    parser.add_argument("--full", action="store_true", help="with --state, recompute every input from scratch")
+    parser.add_argument("--format", dest="input_format", choices=sorted(set(FORMATS.values())), default=None,
+                        help="read the inputs in this format when the data directory holds several")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(sys.argv[1:] if argv is None else argv)
+    result = run(args.data_dir, args.out, args.chunk_size, workers=args.workers,
+                 state_path=args.state, full=args.full, input_format=args.input_format)
+
+    for name, info in result.inputs.items():
+        print(f"{name}: {info['mode']}, {info['read']} new {info['unit']}, "
+              f"{info['students_updated']} students updated")
+    print("Готово! Результати:", args.out)
+    print(result.predictions.head().to_string())
+    if result.adjusted:
+        print("\nВідкориговані ваги:")
+        for k, v in result.adjusted.items():
+            print(f"{k}: {v:.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
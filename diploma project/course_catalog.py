@@ -0,0 +1,98 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+from connection_pool import get_pool
+from prerequisite_graph import PrerequisiteGraph
+from schema import ensure_schema
+
+# ------------------------------------------------------------
+# Course Catalog Cache
+# ------------------------------------------------------------
+# Process-local copy of the courses table and the prerequisite map.
+# The catalog is tiny and rarely changes, so readers revalidate it
+# with one primary-key lookup of catalog_version (bumped by triggers)
+# and only reload when that counter moves.
+# ------------------------------------------------------------
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "system.db")
+
+VERSION_SQL = "SELECT version FROM catalog_version WHERE id = 1;"
+COURSES_SQL = "SELECT * FROM courses ORDER BY name;"
+PREREQUISITES_SQL = "SELECT course_id, prerequisite_course_id FROM course_prerequisites;"
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of the catalog at one version. Arrays are aligned:
+    ids[i] has difficulties[i].
+    """
+
+    def __init__(self, version: int, courses: List[Dict[str, Any]], prerequisites: Dict[int, Set[int]]):
+        self.version = version
+        self.courses = courses
+        self.by_id: Dict[int, Dict[str, Any]] = {int(c["id"]): c for c in courses}
+        self.name_by_id: Dict[int, str] = {int(c["id"]): c["name"] for c in courses}
+        self.id_by_name: Dict[str, int] = {c["name"]: int(c["id"]) for c in courses}
+        self.ids = np.array([int(c["id"]) for c in courses], dtype=np.int64)
+        self.difficulties = np.array([float(c["difficulty"]) for c in courses], dtype=np.float64)
+        self.prerequisites = prerequisites
+        self._graph: Optional[PrerequisiteGraph] = None
+
+    @property
+    def graph(self) -> PrerequisiteGraph:
+        """
+        Prerequisite graph for this version, built on first use.
+        """
+        if self._graph is None:
+            self._graph = PrerequisiteGraph(self.by_id.keys(), self.prerequisites)
+        return self._graph
+
+    def name(self, course_id: int) -> str:
+        return self.name_by_id.get(course_id, f"Course #{course_id}")
+
+
+class CourseCatalog:
+    def __init__(self, path: str = DB_PATH):
+        self.path = os.path.abspath(path)
+        self._pool = get_pool(self.path)
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+
+    def _load(self, conn, version: int) -> CatalogSnapshot:
+        courses = [dict(r) for r in conn.execute(COURSES_SQL)]
+
+        prerequisites: Dict[int, Set[int]] = {}
+        rows = conn.execute(PREREQUISITES_SQL)
+        for course_id, prereq_id in rows:
+            prerequisites.setdefault(int(course_id), set()).add(int(prereq_id))
+
+        return CatalogSnapshot(version, courses, prerequisites)
+
+    def get(self) -> CatalogSnapshot:
+        """
+        Returns the current snapshot, reloading it if the catalog version moved.
+        """
+        ensure_schema(self.path)
+        with self._pool.connection() as conn:
+            version = int(conn.execute(VERSION_SQL).fetchone()[0])
+
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.version == version:
+                return snapshot
+
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.version != version:
+                    snapshot = self._load(conn, version)
+                    self._snapshot = snapshot
+                return snapshot
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+
+
+catalog = CourseCatalog()
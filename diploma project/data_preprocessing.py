@@ -7,6 +7,9 @@ import numpy as np
 # 2) Min-Max normalization
 # 3) Log transformation for skewed data
 # 4) Standardization
+#
+# The functions below handle one value; Preprocessor applies the same
+# steps to whole NumPy columns with parameters fitted once.
 # -----------------------------
 
 def safe_to_float(x):
@@ -88,3 +91,200 @@ def preprocess_parameter(value, vmin, vmax, mean, std, apply_log=False):
         "norm": v_norm,
         "std": v_std
     }
+
+
+class Preprocessor:
+    """
+    Column-wise clean -> optional log1p -> min-max -> standardize.
+
+    Parameters per column are learned with fit / partial_fit (one pass,
+    mergeable across chunks) or taken from stats_manager output with
+    from_stats. transform works in place on float arrays of the chosen
+    dtype (float64 or float32).
+
+    params[column] holds min / max of the values fed to min-max (after
+    log1p for log columns) and mean / std of the min-max normalized
+    values, so the "std" stage is (norm - mean) / std with both in
+    [0, 1] units. from_stats converts raw-space stats to this form.
+    """
+
+    def __init__(self, columns=None, log_columns=(), dtype=np.float64, default=0.0):
+        self.columns = list(columns) if columns is not None else None
+        self.log_columns = set(log_columns)
+        self.dtype = np.dtype(dtype)
+        self.default = default
+        # column -> {"min", "max", "mean", "std"}, see the class docstring.
+        self.params = {}
+        self._running = {}
+
+    # ---------- fitting ----------
+    @classmethod
+    def from_stats(cls, stats, log_columns=(), dtype=np.float64, default=0.0):
+        """
+        Builds params from stats_manager.compute_stats() / load_stats()
+        values, whose mean / std are of the raw column. They are mapped
+        through the column's min-max scaling, giving the params fit would
+        learn from the same data. For log columns the stats must describe
+        the log1p values.
+        """
+        pre = cls(columns=list(stats), log_columns=log_columns, dtype=dtype, default=default)
+        for name, st in stats.items():
+            vmin, vmax = float(st["min"]), float(st["max"])
+            span = vmax - vmin
+            if span == 0:
+                pre.params[name] = {"min": vmin, "max": vmax, "mean": 0.5, "std": 0.0}
+            else:
+                pre.params[name] = {
+                    "min": vmin,
+                    "max": vmax,
+                    "mean": (float(st["mean"]) - vmin) / span,
+                    "std": float(st["std"]) / span,
+                }
+        return pre
+
+    def fit(self, data):
+        self.params = {}
+        self._running = {}
+        return self.partial_fit(data)
+
+    def partial_fit(self, data):
+        """
+        Adds a chunk of rows; count / mean / M2 / min / max are merged
+        with the chunks seen before (Chan et al.), so a large cohort can
+        be fitted chunk by chunk.
+        """
+        for name, values in self._iter_columns(data):
+            v = self._clean(values, copy=True, dtype=np.float64)
+            if name in self.log_columns:
+                self._log1p(v)
+            if v.size == 0:
+                continue
+
+            n_b = v.size
+            mean_b = float(v.mean())
+            m2_b = float(((v - mean_b) ** 2).sum())
+            min_b, max_b = float(v.min()), float(v.max())
+
+            run = self._running.get(name)
+            if run is None:
+                run = {"n": n_b, "mean": mean_b, "m2": m2_b, "min": min_b, "max": max_b}
+            else:
+                n = run["n"] + n_b
+                delta = mean_b - run["mean"]
+                run = {
+                    "n": n,
+                    "mean": run["mean"] + delta * n_b / n,
+                    "m2": run["m2"] + m2_b + delta * delta * run["n"] * n_b / n,
+                    "min": min(run["min"], min_b),
+                    "max": max(run["max"], max_b),
+                }
+            self._running[name] = run
+            self.params[name] = self._params_from_running(run)
+
+        if self.columns is None:
+            self.columns = list(self.params)
+        return self
+
+    @staticmethod
+    def _params_from_running(run):
+        vmin, vmax = run["min"], run["max"]
+        std = float(np.sqrt(run["m2"] / run["n"]))
+        span = vmax - vmin
+        if span == 0:
+            # Every value normalizes to 0.5.
+            return {"min": vmin, "max": vmax, "mean": 0.5, "std": 0.0}
+        return {"min": vmin, "max": vmax, "mean": (run["mean"] - vmin) / span, "std": std / span}
+
+    # ---------- transforming ----------
+    def transform(self, data, stage="std", copy=False):
+        """
+        Applies the pipeline up to stage ("clean", "log", "norm" or "std").
+
+        data is a dict / DataFrame of columns (returns a dict of arrays)
+        or a 2-D array whose columns follow self.columns. Float arrays of
+        self.dtype are transformed in place unless copy is set.
+        """
+        if isinstance(data, np.ndarray) and data.ndim == 2:
+            out = data.astype(self.dtype) if copy or data.dtype != self.dtype else data
+            for j, name in enumerate(self.columns):
+                self.transform_column(name, out[:, j], stage=stage)
+            return out
+
+        return {
+            name: self.transform_column(name, values, stage=stage, copy=copy)
+            for name, values in self._iter_columns(data)
+        }
+
+    def transform_column(self, name, values, stage="std", copy=False):
+        if stage not in ("clean", "log", "norm", "std"):
+            raise ValueError(f"Unknown stage: {stage}")
+
+        v = self._clean(values, copy=copy, dtype=self.dtype)
+        if stage == "clean":
+            return v
+        if name in self.log_columns:
+            self._log1p(v)
+        if stage == "log":
+            return v
+
+        p = self.params.get(name)
+        if p is None:
+            raise KeyError(f"Preprocessor is not fitted for column {name!r}")
+
+        span = p["max"] - p["min"]
+        if span == 0:
+            v.fill(0.5)
+        else:
+            np.subtract(v, p["min"], out=v)
+            np.divide(v, span, out=v)
+        if stage == "norm":
+            return v
+
+        if p["std"] == 0:
+            v.fill(0.0)
+        else:
+            np.subtract(v, p["mean"], out=v)
+            np.divide(v, p["std"], out=v)
+        return v
+
+    def fit_transform(self, data, stage="std"):
+        return self.fit(data).transform(data, stage=stage)
+
+    # ---------- helpers ----------
+    def _iter_columns(self, data):
+        if isinstance(data, np.ndarray) and data.ndim == 2:
+            if self.columns is None or len(self.columns) != data.shape[1]:
+                raise ValueError("columns must name every column of a 2-D array")
+            for j, name in enumerate(self.columns):
+                yield name, data[:, j]
+            return
+
+        names = self.columns if self.columns is not None else list(data.keys())
+        for name in names:
+            values = data[name]
+            yield name, getattr(values, "to_numpy", lambda: values)()
+
+    def _clean(self, values, copy, dtype):
+        """
+        Float array of dtype with missing / invalid values replaced by
+        self.default. Object arrays (strings, None) take the slow path
+        through safe_to_float.
+        """
+        arr = np.asarray(values)
+        if arr.dtype.kind not in "fiub":
+            arr = np.fromiter(
+                (np.nan if (x := safe_to_float(v)) is None else x for v in arr.ravel()),
+                dtype=np.float64,
+                count=arr.size,
+            ).reshape(arr.shape)
+        arr = np.array(arr, dtype=dtype) if copy else np.asarray(arr, dtype=dtype)
+        if not arr.flags.writeable:
+            arr = arr.copy()
+        np.copyto(arr, self.default, where=np.isnan(arr))
+        return arr
+
+    @staticmethod
+    def _log1p(arr):
+        # Negative values become 0, as in log_transform.
+        np.maximum(arr, 0, out=arr)
+        np.log1p(arr, out=arr)
@@ -1,311 +1,229 @@
 import os
-import sqlite3
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from connection_pool import get_pool
+from schema import (
+    DEFAULT_COURSES,
+    SPARSE_STUDENT_COURSES,
+    STUDENT_COURSES_SQL,
+    UPDATE_COURSE_SQL,
+    compact_student_courses,
+    ensure_schema,
+    provision_student_courses,
+    repair_student_courses,
+    seed_catalog,
+    set_student_courses,
+)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "system.db")
 
-DEFAULT_COURSES = [
-    "Mathematics",
-    "Probability and Statistics",
-    "Programming",
-    "Discrete Structures",
-    "Databases",
-    "Algorithms",
-    "Computer Architecture",
-    "Linear Algebra",
-]
+ADD_USER_SQL = "INSERT INTO users (username, password) VALUES (?, ?);"
+GET_USER_SQL = "SELECT * FROM users WHERE username = ?;"
+
+ADD_STUDENT_SQL = "INSERT INTO students (user_id, name) VALUES (?, ?);"
+LIST_STUDENTS_SQL = "SELECT * FROM students WHERE user_id = ?;"
+GET_STUDENT_SQL = "SELECT * FROM students WHERE id = ?;"
+# {columns} is "name=?, ..." for the fields being changed.
+UPDATE_STUDENT_SQL = "UPDATE students SET {columns} WHERE id = ?;"
+DELETE_STUDENT_COURSES_SQL = "DELETE FROM student_courses WHERE student_id = ?;"
+DELETE_STUDENT_PLAN_SQL = "DELETE FROM trajectory_plan WHERE student_id = ?;"
+DELETE_STUDENT_SQL = "DELETE FROM students WHERE id = ?;"
+
+ALL_COURSES_SQL = "SELECT * FROM courses ORDER BY name;"
+PREREQUISITES_SQL = """
+SELECT prerequisite_course_id
+FROM course_prerequisites
+WHERE course_id = ?;
+"""
+
+STUDENT_PLAN_SQL = """
+SELECT tp.course_id as course_id, c.name as name, tp.status as status
+FROM trajectory_plan tp
+JOIN courses c ON c.id = tp.course_id
+WHERE tp.student_id = ? AND tp.semester = ?
+ORDER BY c.name;
+"""
+ADD_TO_PLAN_SQL = """
+INSERT OR IGNORE INTO trajectory_plan(student_id, course_id, semester, status)
+VALUES (?, ?, ?, 'planned');
+"""
+REMOVE_FROM_PLAN_SQL = """
+DELETE FROM trajectory_plan
+WHERE student_id = ? AND course_id = ? AND semester = ?;
+"""
+CLEAR_PLAN_SQL = "DELETE FROM trajectory_plan WHERE student_id = ? AND semester = ?;"
 
 
 class Database:
     def __init__(self, path: str = DB_PATH):
         self.path = os.path.abspath(path)
-        self._ensure_init()
-
-    def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.path)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON;")
-        return conn
+        self._pool = get_pool(self.path)
+        ensure_schema(self.path)
 
     def _fetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
-        conn = self._connect()
-        try:
+        with self._pool.connection() as conn:
             row = conn.execute(sql, params).fetchone()
             return dict(row) if row else None
-        finally:
-            conn.close()
 
-    def _fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
-        conn = self._connect()
-        try:
+    def _fetchall(self, sql: str, params: Union[Sequence[Any], Dict[str, Any]] = ()) -> List[Dict[str, Any]]:
+        with self._pool.connection() as conn:
             rows = conn.execute(sql, params).fetchall()
             return [dict(r) for r in rows]
-        finally:
-            conn.close()
 
     def _execute(self, sql: str, params: Sequence[Any] = ()) -> int:
-        conn = self._connect()
-        try:
+        with self._pool.transaction() as conn:
             cur = conn.execute(sql, params)
-            conn.commit()
             return cur.lastrowid
-        finally:
-            conn.close()
 
     def _executemany(self, sql: str, seq_of_params: Sequence[Sequence[Any]]) -> None:
-        conn = self._connect()
-        try:
+        with self._pool.transaction() as conn:
             conn.executemany(sql, seq_of_params)
-            conn.commit()
-        finally:
-            conn.close()
-
-    def _ensure_init(self) -> None:
-        conn = self._connect()
-        try:
-            cur = conn.cursor()
-
-            cur.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL
-            );
-            """)
-
-            cur.execute("""
-            CREATE TABLE IF NOT EXISTS students (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                name TEXT NOT NULL,
-
-                Ga REAL DEFAULT NULL,
-                Ar REAL DEFAULT NULL,
-                Cp REAL DEFAULT NULL,
-                Ls REAL DEFAULT NULL,
-                Ph REAL DEFAULT NULL,
-
-                Gcurrent REAL DEFAULT NULL,
-                Gmin REAL DEFAULT NULL,
-                Gmax REAL DEFAULT NULL,
-
-                actual REAL DEFAULT NULL,
-                last_prediction REAL DEFAULT NULL,
-
-                FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
-            );
-            """)
-
-            cur.execute("""
-            CREATE TABLE IF NOT EXISTS courses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                difficulty REAL NOT NULL DEFAULT 2.0
-            );
-            """)
-
-            cur.execute("""
-            CREATE TABLE IF NOT EXISTS student_courses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER NOT NULL,
-                course_name TEXT NOT NULL,
-                enabled INTEGER DEFAULT 0,
-                grade REAL DEFAULT NULL,
-                course_id INTEGER DEFAULT NULL,
-                FOREIGN KEY(student_id) REFERENCES students(id) ON DELETE CASCADE,
-                FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE SET NULL
-            );
-            """)
-
-            cur.execute("""
-            CREATE TABLE IF NOT EXISTS course_prerequisites (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                course_id INTEGER NOT NULL,
-                prerequisite_course_id INTEGER NOT NULL,
-                UNIQUE(course_id, prerequisite_course_id),
-                FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE,
-                FOREIGN KEY(prerequisite_course_id) REFERENCES courses(id) ON DELETE CASCADE
-            );
-            """)
-
-            cur.execute("""
-            CREATE TABLE IF NOT EXISTS trajectory_plan (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER NOT NULL,
-                course_id INTEGER NOT NULL,
-                semester TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'planned',
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(student_id, course_id, semester),
-                FOREIGN KEY(student_id) REFERENCES students(id) ON DELETE CASCADE,
-                FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE
-            );
-            """)
-
-            conn.commit()
-        finally:
-            conn.close()
-
-        self.ensure_catalog_ready()
 
     def ensure_catalog_ready(self) -> None:
-        self._seed_courses_catalog()
-        self._sync_student_courses_course_ids()
-        self.fix_empty_course_names()
-
-    def _seed_courses_catalog(self) -> None:
-        existing = self._fetchall("SELECT name FROM courses;")
-        existing_names = {r["name"] for r in existing}
-
-        to_insert = [(name, 2.0) for name in DEFAULT_COURSES if name not in existing_names]
-        if to_insert:
-            self._executemany("INSERT INTO courses(name, difficulty) VALUES (?, ?);", to_insert)
-
-    def _sync_student_courses_course_ids(self) -> None:
-        self._execute("""
-        UPDATE student_courses
-        SET course_id = (SELECT id FROM courses WHERE courses.name = student_courses.course_name)
-        WHERE (course_id IS NULL OR course_id = 0)
-        AND course_name IN (SELECT name FROM courses);
-        """)
-
-    def fix_empty_course_names(self) -> None:
-        self._execute("""
-            UPDATE student_courses
-            SET course_name = (SELECT name FROM courses WHERE courses.id = student_courses.course_id)
-            WHERE (course_name IS NULL OR TRIM(course_name) = '')
-            AND course_id IS NOT NULL;
-        """)
+        """
+        Maintenance only: re-seeds the catalog and repairs student course links.
+        Startup already does this through schema.ensure_schema.
+        """
+        with self._pool.transaction() as conn:
+            cur = conn.cursor()
+            seed_catalog(cur)
+            repair_student_courses(cur)
 
     # ======================================================
     # USERS
     # ======================================================
     def add_user(self, username: str, password: str) -> int:
-        return self._execute(
-            "INSERT INTO users (username, password) VALUES (?, ?);",
-            (username, password),
-        )
+        return self._execute(ADD_USER_SQL, (username, password))
 
     def get_user(self, username: str) -> Optional[Dict[str, Any]]:
-        return self._fetchone("SELECT * FROM users WHERE username = ?;", (username,))
+        return self._fetchone(GET_USER_SQL, (username,))
 
     # ======================================================
     # STUDENTS
     # ======================================================
     def add_student(self, user_id: int, name: str) -> int:
-        sid = self._execute("INSERT INTO students (user_id, name) VALUES (?, ?);", (user_id, name))
-        self.create_missing_student_courses(sid)
-        self.ensure_catalog_ready()
+        sid = self._execute(ADD_STUDENT_SQL, (user_id, name))
+        if not SPARSE_STUDENT_COURSES:
+            self.create_missing_student_courses(sid)
         return sid
 
     def list_students(self, user_id: int) -> List[Dict[str, Any]]:
-        return self._fetchall("SELECT * FROM students WHERE user_id = ?;", (user_id,))
+        return self._fetchall(LIST_STUDENTS_SQL, (user_id,))
 
     def get_student(self, student_id: int) -> Optional[Dict[str, Any]]:
-        return self._fetchone("SELECT * FROM students WHERE id = ?;", (student_id,))
+        return self._fetchone(GET_STUDENT_SQL, (student_id,))
 
     def update_student(self, student_id: int, **fields: Any) -> None:
         if not fields:
             return
         columns = ", ".join(f"{k}=?" for k in fields.keys())
         values = list(fields.values())
-        self._execute(f"UPDATE students SET {columns} WHERE id = ?;", values + [student_id])
+        self._execute(UPDATE_STUDENT_SQL.format(columns=columns), values + [student_id])
+
+    def update_student_with_courses(
+        self,
+        student_id: int,
+        fields: Dict[str, Any],
+        courses: Iterable[Tuple[int, int, Optional[float]]],
+    ) -> int:
+        """
+        Saves the edit form as one unit of work: student scalar fields plus
+        (course_id, enabled, grade) states, in a single transaction.
+        Values that did not change are skipped. Returns the number of
+        fields and courses written.
+        """
+        with self._pool.transaction() as conn:
+            current = conn.execute(GET_STUDENT_SQL, (student_id,)).fetchone()
+            if current is None:
+                return 0
+
+            changed_fields = {k: v for k, v in fields.items() if current[k] != v}
+            if changed_fields:
+                columns = ", ".join(f"{k}=?" for k in changed_fields.keys())
+                conn.execute(
+                    UPDATE_STUDENT_SQL.format(columns=columns),
+                    list(changed_fields.values()) + [student_id],
+                )
+
+            stored = {
+                int(r["course_id"]): (int(r["enabled"]), r["grade"])
+                for r in conn.execute(STUDENT_COURSES_SQL, {"student_id": student_id})
+            }
+            changed_courses = [
+                (cid, enabled, grade)
+                for cid, enabled, grade in courses
+                if stored.get(cid) != (enabled, grade)
+            ]
+            set_student_courses(conn.cursor(), student_id, changed_courses)
+
+        return len(changed_fields) + len(changed_courses)
 
     def delete_student(self, student_id: int) -> None:
-        self._execute("DELETE FROM student_courses WHERE student_id = ?;", (student_id,))
-        self._execute("DELETE FROM trajectory_plan WHERE student_id = ?;", (student_id,))
-        self._execute("DELETE FROM students WHERE id = ?;", (student_id,))
+        """
+        Removes the student with their course and plan rows in one
+        transaction, so a failure never leaves orphaned rows behind.
+        """
+        with self._pool.transaction() as conn:
+            conn.execute(DELETE_STUDENT_COURSES_SQL, (student_id,))
+            conn.execute(DELETE_STUDENT_PLAN_SQL, (student_id,))
+            conn.execute(DELETE_STUDENT_SQL, (student_id,))
 
     # ======================================================
     # STUDENT COURSES
     # ======================================================
+    def provision_student_courses(self, student_id: Optional[int] = None, user_id: Optional[int] = None) -> int:
+        """
+        Fills in missing default course rows for one student, for all students
+        of a user, or (with no arguments) for everyone, in one statement.
+        """
+        with self._pool.transaction() as conn:
+            return provision_student_courses(conn.cursor(), student_id=student_id, user_id=user_id)
+
     def create_missing_student_courses(self, student_id: int) -> None:
-        existing = self._fetchall(
-            "SELECT course_name FROM student_courses WHERE student_id = ?;",
-            (student_id,),
-        )
-        existing_names = {r["course_name"] for r in existing}
-
-        inserts: List[Tuple[int, str, Optional[int]]] = []
-        for cname in DEFAULT_COURSES:
-            if cname in existing_names:
-                continue
-            row = self._fetchone("SELECT id FROM courses WHERE name = ?;", (cname,))
-            course_id = int(row["id"]) if row else None
-            inserts.append((student_id, cname, course_id))
-
-        if inserts:
-            self._executemany(
-                "INSERT INTO student_courses (student_id, course_name, enabled, grade, course_id) VALUES (?, ?, 0, NULL, ?);",
-                inserts,
-            )
+        self.provision_student_courses(student_id=student_id)
 
     def get_student_courses(self, student_id: int) -> List[Dict[str, Any]]:
-        return self._fetchall("""
-            SELECT sc.*, c.difficulty as difficulty
-            FROM student_courses sc
-            LEFT JOIN courses c ON c.id = sc.course_id
-            WHERE sc.student_id = ?
-            ORDER BY sc.course_name;
-        """, (student_id,))
+        return self._fetchall(STUDENT_COURSES_SQL, {"student_id": student_id})
+
+    def compact_student_courses(self) -> int:
+        """
+        Drops course rows that are neither enabled nor graded (sparse storage).
+        """
+        with self._pool.transaction() as conn:
+            return compact_student_courses(conn.cursor())
 
     def update_course(self, course_row_id: int, enabled: int, grade: Optional[float]) -> None:
-        self._execute(
-            "UPDATE student_courses SET enabled = ?, grade = ? WHERE id = ?;",
-            (enabled, grade, course_row_id),
-        )
+        self._execute(UPDATE_COURSE_SQL, (enabled, grade, course_row_id))
 
     # ======================================================
     # COURSES / PREREQUISITES
     # ======================================================
     def get_all_courses(self) -> List[Dict[str, Any]]:
-        return self._fetchall("SELECT * FROM courses ORDER BY name;")
+        return self._fetchall(ALL_COURSES_SQL)
 
     def get_prerequisites(self, course_id: int) -> List[Dict[str, Any]]:
-        return self._fetchall("""
-            SELECT prerequisite_course_id
-            FROM course_prerequisites
-            WHERE course_id = ?;
-        """, (course_id,))
+        return self._fetchall(PREREQUISITES_SQL, (course_id,))
 
     # ======================================================
     # TRAJECTORY PLAN
     # ======================================================
     def get_student_plan(self, student_id: int, semester: str) -> List[Dict[str, Any]]:
-        return self._fetchall("""
-            SELECT tp.course_id as course_id, c.name as name, tp.status as status
-            FROM trajectory_plan tp
-            JOIN courses c ON c.id = tp.course_id
-            WHERE tp.student_id = ? AND tp.semester = ?
-            ORDER BY c.name;
-        """, (student_id, semester))
+        return self._fetchall(STUDENT_PLAN_SQL, (student_id, semester))
 
     def add_to_plan(self, student_id: int, course_id: int, semester: str) -> int:
-        return self._execute("""
-            INSERT OR IGNORE INTO trajectory_plan(student_id, course_id, semester, status)
-            VALUES (?, ?, ?, 'planned');
-        """, (student_id, course_id, semester))
+        return self._execute(ADD_TO_PLAN_SQL, (student_id, course_id, semester))
 
     def remove_from_plan(self, student_id: int, course_id: int, semester: str) -> None:
-        self._execute("""
-            DELETE FROM trajectory_plan
-            WHERE student_id = ? AND course_id = ? AND semester = ?;
-        """, (student_id, course_id, semester))
+        self._execute(REMOVE_FROM_PLAN_SQL, (student_id, course_id, semester))
 
     def clear_plan(self, student_id: int, semester: str) -> None:
-        self._execute(
-            "DELETE FROM trajectory_plan WHERE student_id = ? AND semester = ?;",
-            (student_id, semester),
-        )
+        self._execute(CLEAR_PLAN_SQL, (student_id, semester))
 
     def bulk_add_to_plan(self, student_id: int, semester: str, course_ids: List[int]) -> None:
         if not course_ids:
             return
         self._executemany(
-            """
-            INSERT OR IGNORE INTO trajectory_plan(student_id, course_id, semester, status)
-            VALUES (?, ?, ?, 'planned');
-            """,
+            ADD_TO_PLAN_SQL,
             [(student_id, int(cid), semester) for cid in course_ids],
         )
@@ -0,0 +1,370 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# ------------------------------------------------------------
+# Feature Pipeline
+# ------------------------------------------------------------
+# One implementation of the weighted prediction formula
+#   P = alpha*Ga + beta*Ar + gamma*Cp + delta*Ls + epsilon*Ph
+# plus the K correction of alpha and beta when the outcome is known.
+#
+# A Strategy bundles a pre-built weight vector, K and a normalization
+# plan; strategies are registered by name. score() runs a strategy on
+# scalars or on NumPy arrays (vectorized, same operation order, so both
+# paths give identical results). The scalar scorer is compiled once per
+# strategy with its weights and plan bound as closure locals: plain
+# float arithmetic, no dicts, no exceptions for numeric input.
+#
+# Registered strategies:
+#   "engine" - prediction_engine.predict: percent values mapped to
+#              [0, 1], features clipped, missing Ga falls back to Cp,
+#              correction K * error * x * |error|.
+#   "model"  - prediction_model.compute_prediction: raw values
+#              ("0,5" accepted), missing -> 0, correction K * error * x.
+# ------------------------------------------------------------
+
+WEIGHT_KEYS = ("alpha", "beta", "gamma", "delta", "epsilon")
+FEATURES = ("Ga", "Ar", "Cp", "Ls", "Ph")
+
+WEIGHTS = {
+    "alpha": 0.35,   # Ga
+    "beta": 0.25,    # Ar
+    "gamma": 0.20,   # Cp
+    "delta": 0.15,   # Ls
+    "epsilon": 0.05  # Ph
+}
+
+K = 0.9
+
+# Feature normalization modes:
+#   "clip01" - clip to [0, 1]
+#   "to01"   - missing -> 0, values above 1.5 are percent (/100), clip to [0, 1]
+#   "raw"    - missing -> 0, no scaling
+NORMALIZATION_MODES = ("clip01", "to01", "raw")
+
+
+def _to01(v: Optional[float]) -> float:
+    if v is None:
+        return 0.0
+    if v > 1.5:
+        v = v / 100.0
+    return min(max(v, 0.0), 1.0)
+
+
+_NUMERIC = (float, int, bool, np.floating, np.integer)
+
+
+def parse(x, comma_decimal: bool = False) -> Optional[float]:
+    """
+    float(x), or None for None, "" and unparsable input.
+    Numeric input never goes through an exception.
+    """
+    if type(x) is float:
+        return x
+    if x is None:
+        return None
+    if isinstance(x, _NUMERIC):
+        return float(x)
+    if isinstance(x, str):
+        if comma_decimal:
+            x = x.replace(",", ".")
+        elif x == "":
+            return None
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return None
+
+
+def _clip01(v: float) -> float:
+    # Same result as float(np.clip(v, 0.0, 1.0)), NaN included.
+    return v if v != v else min(max(v, 0.0), 1.0)
+
+
+def _compile_scalar(weights, k, plan, squared_error, reset_nonpositive, minmax_clip):
+    """
+    Returns scalar(Ga, Ar, Cp, Ls, Ph, actual=None) for one strategy.
+    Normalization is inlined per feature: "to01" calls _to01, "raw"
+    maps None to 0, "clip01" clips after the Ga fallback.
+    """
+    w0, w1, w2, w3, w4 = weights
+    base_sum = w0 + w1 + w2 + w3 + w4
+    comma = plan.comma_decimal
+    modes = plan.features
+    to_ga, to_ar, to_cp, to_ls, to_ph = (mode == "to01" for mode in modes)
+    clip_ga, clip_ar, clip_cp = (mode == "clip01" for mode in modes[:3])
+    # A "raw" Ga is already 0 when missing, so only clip01 falls back.
+    ga_fallback_cp = plan.ga_fallback_cp and clip_ga
+    actual_to01 = plan.actual == "to01"
+
+    def scalar(Ga, Ar, Cp, Ls, Ph, actual=None):
+        cp = Cp if type(Cp) is float else parse(Cp, comma)
+        if to_cp:
+            cp = _to01(cp)
+        elif cp is None:
+            cp = 0.0
+        ar = Ar if type(Ar) is float else parse(Ar, comma)
+        if to_ar:
+            ar = _to01(ar)
+        elif ar is None:
+            ar = 0.0
+        ga = Ga if type(Ga) is float else parse(Ga, comma)
+        if to_ga:
+            ga = _to01(ga)
+        elif ga is None:
+            ga = cp if ga_fallback_cp else 0.0
+        ls = Ls if type(Ls) is float else parse(Ls, comma)
+        if to_ls:
+            ls = _to01(ls)
+        elif ls is None:
+            ls = 0.0
+        ph = Ph if type(Ph) is float else parse(Ph, comma)
+        if to_ph:
+            ph = _to01(ph)
+        elif ph is None:
+            ph = 0.0
+
+        if clip_ga:
+            ga = _clip01(ga)
+        if clip_ar:
+            ar = _clip01(ar)
+        if clip_cp:
+            cp = _clip01(cp)
+
+        p_initial = w0 * ga + w1 * ar + w2 * cp + w3 * ls + w4 * ph
+        p_initial = max(0, min(1, p_initial)) if minmax_clip else _clip01(p_initial)
+
+        y = actual if type(actual) is float else parse(actual, comma)
+        if y is None:
+            return p_initial, None, weights
+        if actual_to01:
+            y = _to01(y)
+
+        error = y - p_initial
+        dG = error * ga
+        dA = error * ar
+        if squared_error:
+            dG = dG * abs(error)
+            dA = dA * abs(error)
+
+        a = w0 * (1 + k * dG)
+        b = w1 * (1 + k * dA)
+        c, d, e = w2, w3, w4
+
+        s = a + b + c + d + e
+        if reset_nonpositive:
+            if s <= 0:
+                a, b, c, d, e = weights
+                s = base_sum
+        elif s == 0:
+            a, b, c, d, e = weights
+            s = 1.0
+        a, b, c, d, e = a / s, b / s, c / s, d / s, e / s
+
+        p_adjusted = a * ga + b * ar + c * cp + d * ls + e * ph
+        p_adjusted = max(0, min(1, p_adjusted)) if minmax_clip else _clip01(p_adjusted)
+        return p_initial, p_adjusted, (a, b, c, d, e)
+
+    return scalar
+
+
+class NormalizationPlan(NamedTuple):
+    features: Tuple[str, str, str, str, str]
+    actual: str
+    ga_fallback_cp: bool
+    comma_decimal: bool
+
+
+class Strategy(NamedTuple):
+    name: str
+    weights: Tuple[float, float, float, float, float]
+    k: float
+    plan: NormalizationPlan
+    # correction is K * error * x * |error| instead of K * error * x
+    squared_error: bool
+    # weights are reset when their sum is <= 0 (instead of == 0) and
+    # the reset weights are normalized as well
+    reset_nonpositive: bool
+    # scalar P is clipped with max(0, min(1, P)) as in
+    # prediction_model, which maps NaN to 1 instead of keeping it
+    minmax_clip: bool
+    # scalar scorer compiled from the fields above, see score_scalar
+    scalar: Callable[..., Tuple[float, Optional[float], Tuple[float, ...]]]
+
+
+_strategies: Dict[str, Strategy] = {}
+
+
+def build_strategy(name: str, weights: Dict[str, float], k: float, plan: NormalizationPlan,
+                   squared_error: bool, reset_nonpositive: bool, minmax_clip: bool = False) -> Strategy:
+    for mode in plan.features + (plan.actual,):
+        if mode not in NORMALIZATION_MODES:
+            raise ValueError(f"Unknown normalization mode: {mode}")
+    w = tuple(float(weights[key]) for key in WEIGHT_KEYS)
+    return Strategy(
+        name,
+        w,
+        float(k),
+        plan,
+        squared_error,
+        reset_nonpositive,
+        minmax_clip,
+        _compile_scalar(w, float(k), plan, squared_error, reset_nonpositive, minmax_clip),
+    )
+
+
+def register(strategy: Strategy) -> Strategy:
+    _strategies[strategy.name] = strategy
+    return strategy
+
+
+def get_strategy(name: str) -> Strategy:
+    try:
+        return _strategies[name]
+    except KeyError:
+        raise ValueError(f"Unknown strategy: {name}") from None
+
+
+def strategy_names() -> Tuple[str, ...]:
+    return tuple(_strategies)
+
+
+ENGINE_PLAN = NormalizationPlan(
+    features=("clip01", "clip01", "clip01", "to01", "to01"),
+    actual="to01",
+    ga_fallback_cp=True,
+    comma_decimal=False,
+)
+
+MODEL_PLAN = NormalizationPlan(
+    features=("raw", "raw", "raw", "raw", "raw"),
+    actual="raw",
+    ga_fallback_cp=False,
+    comma_decimal=True,
+)
+
+
+def engine_strategy(weights: Dict[str, float] = WEIGHTS, k: float = K) -> Strategy:
+    return build_strategy("engine", weights, k, ENGINE_PLAN, squared_error=True, reset_nonpositive=True)
+
+
+register(engine_strategy())
+register(build_strategy("model", WEIGHTS, K, MODEL_PLAN, squared_error=False, reset_nonpositive=False,
+                        minmax_clip=True))
+
+
+# ------------------------------------------------------------
+# Scalars
+# ------------------------------------------------------------
+def score_scalar(strategy: Strategy, Ga, Ar, Cp, Ls, Ph, actual=None):
+    """
+    Returns (p_initial, p_adjusted or None, weights tuple in WEIGHT_KEYS order).
+    """
+    return strategy.scalar(Ga, Ar, Cp, Ls, Ph, actual)
+
+
+# ------------------------------------------------------------
+# Arrays
+# ------------------------------------------------------------
+def _normalize_array(v: np.ndarray, mode: str) -> np.ndarray:
+    if mode == "clip01":
+        return v
+    v = np.where(np.isnan(v), 0.0, v)
+    if mode == "to01":
+        v = np.where(v > 1.5, v / 100.0, v)
+        return np.clip(v, 0.0, 1.0)
+    return v
+
+
+def score_arrays(strategy: Strategy, Ga, Ar, Cp, Ls, Ph, actual=None):
+    """
+    Vectorized score_scalar over float arrays; NaN marks a missing value.
+    Returns (p_initial, p_adjusted with NaN where actual is missing,
+    (N, 5) weights).
+    """
+    plan = strategy.plan
+    modes = plan.features
+    cols = [np.asarray(x, dtype=np.float64) for x in (Ga, Ar, Cp, Ls, Ph)]
+    ga, ar, cp, ls, ph = (_normalize_array(v, mode) for v, mode in zip(cols, modes))
+
+    cp = np.where(np.isnan(cp), 0.0, cp)
+    ar = np.where(np.isnan(ar), 0.0, ar)
+    ga = np.where(np.isnan(ga), cp if plan.ga_fallback_cp else 0.0, ga)
+
+    if modes[0] == "clip01":
+        ga = np.clip(ga, 0.0, 1.0)
+    if modes[1] == "clip01":
+        ar = np.clip(ar, 0.0, 1.0)
+    if modes[2] == "clip01":
+        cp = np.clip(cp, 0.0, 1.0)
+
+    w = strategy.weights
+    p_initial = np.clip(w[0] * ga + w[1] * ar + w[2] * cp + w[3] * ls + w[4] * ph, 0.0, 1.0)
+
+    n = p_initial.shape[0]
+    if actual is None:
+        actual = np.full(n, np.nan)
+    y = np.asarray(actual, dtype=np.float64)
+    has_actual = ~np.isnan(y)
+    if plan.actual == "to01":
+        y = _normalize_array(y, "to01")
+    else:
+        y = np.where(has_actual, y, 0.0)
+
+    error = y - p_initial
+    dG = error * ga
+    dA = error * ar
+    if strategy.squared_error:
+        dG = dG * np.abs(error)
+        dA = dA * np.abs(error)
+
+    updated = np.empty((n, 5), dtype=np.float64)
+    updated[:, 0] = w[0] * (1 + strategy.k * dG)
+    updated[:, 1] = w[1] * (1 + strategy.k * dA)
+    updated[:, 2] = w[2]
+    updated[:, 3] = w[3]
+    updated[:, 4] = w[4]
+
+    s = updated[:, 0] + updated[:, 1] + updated[:, 2] + updated[:, 3] + updated[:, 4]
+    base_sum = w[0] + w[1] + w[2] + w[3] + w[4]
+    if strategy.reset_nonpositive:
+        reset = s <= 0
+        if reset.any():
+            updated[reset] = w
+            s = np.where(reset, base_sum, s)
+        updated /= s[:, None]
+    else:
+        reset = s == 0
+        if reset.any():
+            updated[reset] = w
+            s = np.where(reset, 1.0, s)
+        updated /= s[:, None]
+
+    p_adjusted = np.clip(
+        updated[:, 0] * ga + updated[:, 1] * ar + updated[:, 2] * cp + updated[:, 3] * ls + updated[:, 4] * ph,
+        0.0, 1.0,
+    )
+    p_adjusted = np.where(has_actual, p_adjusted, np.nan)
+    updated[~has_actual] = w
+
+    return p_initial, p_adjusted, updated
+
+
+def score(strategy, Ga, Ar, Cp, Ls, Ph, actual=None):
+    """
+    Runs a strategy (or a registered strategy name) on scalars or arrays.
+    """
+    if isinstance(strategy, str):
+        strategy = get_strategy(strategy)
+    if isinstance(Ga, np.ndarray) and Ga.ndim > 0:
+        return score_arrays(strategy, Ga, Ar, Cp, Ls, Ph, actual)
+    return score_scalar(strategy, Ga, Ar, Cp, Ls, Ph, actual)
+
+
+def weights_dict(weights) -> Dict[str, float]:
+    # A literal is faster than dict(zip(WEIGHT_KEYS, ...)); same key order.
+    a, b, c, d, e = weights
+    return {"alpha": a, "beta": b, "gamma": c, "delta": d, "epsilon": e}
@@ -1,45 +1,49 @@
-import sqlite3
 import os
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
+
+from connection_pool import get_pool
+from history_writer import get_writer
+from schema import HISTORY_DELETE_EXPIRED_SQL, HISTORY_ROLLUP_SQL, ensure_schema
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "system.db")
 
+# Raw history rows are kept this long; older rows are rolled into
+# history_daily by compact().
+HISTORY_RETENTION_DAYS = 90
+COMPACT_BATCH_SIZE = 500
+
+HISTORY_SQL = """
+SELECT * FROM history
+WHERE student_id=?
+ORDER BY timestamp ASC
+"""
+
+DAILY_HISTORY_SQL = """
+SELECT
+    student_id, day, count,
+    sum_p_initial / NULLIF(count_p_initial, 0) AS mean_p_initial,
+    sum_p_adjusted / NULLIF(count_p_adjusted, 0) AS mean_p_adjusted,
+    sum_error / NULLIF(count_error, 0) AS mean_error,
+    last_timestamp,
+    last_alpha AS alpha,
+    last_beta AS beta,
+    last_gamma AS gamma,
+    last_delta AS delta,
+    last_epsilon AS epsilon
+FROM history_daily
+WHERE student_id=?
+ORDER BY day ASC
+"""
+
 
 class HistoryManager:
-    def __init__(self):
-        self._init_table()
-
-    def _connect(self):
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON;")
-        return conn
-
-    def _init_table(self):
-        conn = self._connect()
-        cur = conn.cursor()
-
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_id INTEGER,
-            timestamp TEXT,
-            p_initial REAL,
-            p_adjusted REAL,
-            alpha REAL,
-            beta REAL,
-            gamma REAL,
-            delta REAL,
-            epsilon REAL,
-            actual REAL,
-            error REAL,
-            FOREIGN KEY(student_id) REFERENCES students(id) ON DELETE CASCADE
-        );
-        """)
-
-        conn.commit()
-        conn.close()
+    def __init__(self, path=DB_PATH):
+        self.path = os.path.abspath(path)
+        self._pool = get_pool(self.path)
+        ensure_schema(self.path)
+        self.writer = get_writer(self.path)
 
     def add_record(self, student_id, p_initial, p_adjusted, weights, actual):
         error = None
@@ -49,15 +53,7 @@ class HistoryManager:
             except Exception:
                 error = None
 
-        conn = self._connect()
-        cur = conn.cursor()
-
-        cur.execute("""
-        INSERT INTO history (
-            student_id, timestamp, p_initial, p_adjusted,
-            alpha, beta, gamma, delta, epsilon, actual, error
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        self.writer.enqueue((
             student_id,
             datetime.now().isoformat(),
             p_initial,
@@ -71,21 +67,47 @@ class HistoryManager:
             error
         ))
 
-        conn.commit()
-        conn.close()
-
     def get_history(self, student_id):
-        conn = self._connect()
-        cur = conn.cursor()
+        self.writer.flush()
+        with self._pool.connection() as conn:
+            rows = conn.execute(HISTORY_SQL, (student_id,)).fetchall()
 
-        rows = cur.execute("""
-        SELECT * FROM history
-        WHERE student_id=?
-        ORDER BY timestamp ASC
-        """, (student_id,)).fetchall()
-
-        conn.close()
         return rows
 
+    def get_daily_history(self, student_id):
+        """
+        Rolled-up days older than the retention window, oldest first,
+        with means computed from the stored sums.
+        """
+        with self._pool.connection() as conn:
+            rows = conn.execute(DAILY_HISTORY_SQL, (student_id,)).fetchall()
+
+        return rows
 
-history = HistoryManager()
+    def compact(self, retention_days=HISTORY_RETENTION_DAYS, batch_size=COMPACT_BATCH_SIZE,
+                max_batches=None, pause=0.0):
+        """
+        Rolls raw rows older than retention_days into history_daily and
+        deletes them, batch_size rows per short transaction.
+        Returns the number of raw rows compacted.
+        """
+        self.writer.flush()
+        params = {
+            "cutoff": (datetime.now() - timedelta(days=retention_days)).isoformat(),
+            "batch": batch_size,
+        }
+
+        compacted = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            with self._pool.transaction() as conn:
+                conn.execute(HISTORY_ROLLUP_SQL, params)
+                removed = conn.execute(HISTORY_DELETE_EXPIRED_SQL, params).rowcount
+            compacted += removed
+            batches += 1
+            if removed < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+
+        return compacted
@@ -0,0 +1,245 @@
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+from connection_pool import get_pool
+
+# ------------------------------------------------------------
+# History Writer
+# ------------------------------------------------------------
+# Background writer for prediction history rows. Request handlers
+# only enqueue a tuple; a single worker thread drains the queue and
+# inserts rows with executemany, one transaction per batch.
+# A batch is flushed when BATCH_SIZE rows are waiting or
+# FLUSH_INTERVAL_MS after its first row, whichever comes first.
+# When the queue is full, enqueue blocks (backpressure) until the
+# worker catches up. Pending rows are flushed at interpreter exit.
+#
+# A batch that fails with a transient error (database locked / busy)
+# is retried with exponential backoff until it succeeds; meanwhile the
+# queue fills and enqueue applies backpressure. Only once the writer
+# is closing does it give up after WRITE_RETRIES attempts. A batch that
+# fails otherwise (or is given up on) is inserted one row at a time,
+# so one bad row cannot take the rest with it; rows that fail even
+# then are logged with their values and counted as dropped.
+# ------------------------------------------------------------
+
+BATCH_SIZE = 100
+FLUSH_INTERVAL_MS = 200
+MAX_QUEUE = 10000
+WRITE_RETRIES = 5
+RETRY_BACKOFF_MS = 50
+MAX_BACKOFF_MS = 2000
+
+log = logging.getLogger(__name__)
+
+INSERT_SQL = """
+INSERT INTO history (
+    student_id, timestamp, p_initial, p_adjusted,
+    alpha, beta, gamma, delta, epsilon, actual, error
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_STOP = object()
+
+
+class HistoryWriter:
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = BATCH_SIZE,
+        flush_interval_ms: int = FLUSH_INTERVAL_MS,
+        max_queue: int = MAX_QUEUE,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.written = 0
+        self.batches = 0
+        self.blocked = 0
+        self.errors = 0
+        self.retries = 0
+        self.dropped = 0
+        self.last_error: Optional[str] = None
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, row: Sequence[Any]) -> None:
+        """
+        Queues one history row (INSERT_SQL parameter order).
+        Blocks while the queue is full.
+        """
+        if self._closed:
+            self._write([tuple(row)])
+            return
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(tuple(row))
+        except queue.Full:
+            self.blocked += 1
+            self._queue.put(tuple(row))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                self._write(batch)
+            finally:
+                for _ in range(len(batch) + (1 if stop else 0)):
+                    self._queue.task_done()
+
+            if stop:
+                return
+
+    def _insert(self, rows) -> None:
+        """
+        Inserts rows in one transaction, retrying transient errors with backoff.
+        """
+        delay = RETRY_BACKOFF_MS / 1000.0
+        attempt = 0
+        while True:
+            try:
+                with get_pool(self.path).transaction() as conn:
+                    conn.executemany(INSERT_SQL, rows)
+                return
+            except sqlite3.OperationalError as e:
+                if not _is_transient(e) or (self._closed and attempt >= WRITE_RETRIES):
+                    raise
+                if attempt % WRITE_RETRIES == 0:
+                    log.warning("history write of %d rows failed (%s), retrying", len(rows), e)
+                self.retries += 1
+                attempt += 1
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_BACKOFF_MS / 1000.0)
+
+    def _write(self, batch) -> None:
+        started = time.perf_counter()
+        try:
+            self._insert(batch)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = repr(e)
+            log.error("history batch of %d rows failed (%r), inserting rows one by one", len(batch), e)
+            self._write_rows(batch)
+            return
+
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        self.written += len(batch)
+        self.batches += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    def _write_rows(self, batch) -> None:
+        for row in batch:
+            try:
+                with get_pool(self.path).transaction() as conn:
+                    conn.execute(INSERT_SQL, row)
+            except Exception as e:
+                self.dropped += 1
+                self.last_error = repr(e)
+                log.error("history row dropped (%r): %r", e, row)
+            else:
+                self.written += 1
+
+    def flush(self) -> None:
+        """
+        Waits until every row queued so far has been written.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        """
+        Flushes pending rows and stops the worker; later rows are written synchronously.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "written": self.written,
+            "batches": self.batches,
+            "blocked_enqueues": self.blocked,
+            "errors": self.errors,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "last_error": self.last_error,
+            "last_flush_ms": self.last_flush_ms,
+            "avg_flush_ms": (self._total_flush_ms / self.batches) if self.batches else 0.0,
+            "max_flush_ms": self.max_flush_ms,
+        }
+
+
+def _is_transient(error: sqlite3.OperationalError) -> bool:
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+_writers: Dict[str, HistoryWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(path: str) -> HistoryWriter:
+    """
+    Returns the process-wide writer for path, creating it on first use.
+    """
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = HistoryWriter(path)
+            _writers[path] = writer
+        return writer
+
+
+@atexit.register
+def close_all() -> None:
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.close()
@@ -0,0 +1,257 @@
+import argparse
+import json
+import sys
+import time
+from typing import List, Optional
+
+from connection_pool import get_pool
+from database import Database
+import model_analytics
+import model_store
+from prediction_engine import WEIGHT_KEYS
+from prediction_refresh import refresh_predictions
+from schema import SPARSE_STUDENT_COURSES, ensure_schema
+import weight_training
+import weight_tuner
+
+# ------------------------------------------------------------
+# Admin CLI
+# ------------------------------------------------------------
+# Maintenance commands that run against system.db outside of the
+# web app. Usage: python manage.py <command> [options]
+# Only the database given by --db (default system.db) is opened:
+# modules that touch a database are imported by the commands that
+# use them.
+# ------------------------------------------------------------
+
+
+def cmd_provision(args: argparse.Namespace) -> int:
+    if SPARSE_STUDENT_COURSES:
+        print("student_courses is sparse (SPARSE_STUDENT_COURSES); empty default rows are not stored.",
+              file=sys.stderr)
+        return 1
+
+    db = Database(args.db) if args.db else Database()
+
+    started = time.perf_counter()
+    inserted = db.provision_student_courses(student_id=args.student, user_id=args.user)
+    elapsed = time.perf_counter() - started
+
+    print(f"Provisioned {inserted} student course rows in {elapsed:.2f}s.")
+    return 0
+
+
+def cmd_compact_courses(args: argparse.Namespace) -> int:
+    db = Database(args.db) if args.db else Database()
+    removed = db.compact_student_courses()
+    print(f"Removed {removed} empty student course rows.")
+    return 0
+
+
+def cmd_refresh_predictions(args: argparse.Namespace) -> int:
+    db_path = args.db or Database().path
+    result = refresh_predictions(db_path, chunk_size=args.chunk_size)
+    print(
+        f"Scored {int(result['students'])} students: "
+        f"load {result['load_s']:.2f}s, score {result['score_s']:.2f}s, write {result['write_s']:.2f}s."
+    )
+    return 0
+
+
+def cmd_compact_history(args: argparse.Namespace) -> int:
+    from history_manager import COMPACT_BATCH_SIZE, HISTORY_RETENTION_DAYS, HistoryManager
+
+    manager = HistoryManager(args.db) if args.db else HistoryManager()
+    days = HISTORY_RETENTION_DAYS if args.days is None else args.days
+
+    started = time.perf_counter()
+    compacted = manager.compact(
+        retention_days=days,
+        batch_size=COMPACT_BATCH_SIZE if args.batch_size is None else args.batch_size,
+        max_batches=args.max_batches,
+        pause=args.pause,
+    )
+    elapsed = time.perf_counter() - started
+
+    print(f"Rolled up {compacted} history rows older than {days} days in {elapsed:.2f}s.")
+    return 0
+
+
+def cmd_analytics(args: argparse.Namespace) -> int:
+    report = model_analytics.analyze(
+        args.db or model_analytics.DB_PATH,
+        window=args.window,
+        bins=args.bins,
+        chunk_size=args.chunk_size,
+    )
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(model_analytics.format_report(report))
+    return 0
+
+
+def cmd_train_weights(args: argparse.Namespace) -> int:
+    result = weight_training.train_weights(
+        args.db or weight_training.DB_PATH,
+        activate_version=not args.no_activate,
+        k=args.k,
+    )
+    weights = ", ".join(f"{key}={value:.4f}" for key, value in result["weights"].items())
+    print(f"Version {result['version']} ({'active' if result['active'] else 'inactive'}): {weights}, K={result['k']:.4f}")
+    print(
+        f"Fitted on {result['samples']} students in {result['elapsed_s']:.2f}s: "
+        f"MAE {result['mae']:.4f} (version {result['previous_version']}: {result['previous_mae']:.4f}), "
+        f"RMSE {result['rmse']:.4f}."
+    )
+    return 0
+
+
+def cmd_weights(args: argparse.Namespace) -> int:
+    pool = get_pool(args.db or model_store.DB_PATH)
+    ensure_schema(pool.path)
+
+    if args.activate is not None or args.builtin:
+        with pool.transaction() as conn:
+            model_store.activate(conn, None if args.builtin else args.activate)
+
+    with pool.connection() as conn:
+        rows = model_store.list_versions(conn)
+
+    if not rows:
+        print("No stored weight sets; using the built-in weights.")
+    for r in rows:
+        weights = " ".join(f"{r[key]:.4f}" for key in WEIGHT_KEYS)
+        mae = "—" if r["mae"] is None else f"{r['mae']:.4f}"
+        print(f"{'*' if r['active'] else ' '} v{r['version']:<4} {weights}  K={r['k']:.3f}  "
+              f"{r['source']:<14} n={r['samples']:<8} MAE={mae}  {r['created_at']}")
+    return 0
+
+
+def cmd_tune_weights(args: argparse.Namespace) -> int:
+    k_values = [float(v) for v in args.k.split(",")] if args.k else weight_tuner.K_VALUES
+    result = weight_tuner.tune(
+        args.db or weight_tuner.DB_PATH,
+        step=args.step,
+        k_values=k_values,
+        rank_by=args.rank_by,
+        top=args.top,
+        save=args.save or args.activate,
+        activate_best=args.activate,
+    )
+
+    print(
+        f"Scored {result['candidates']} candidates on {result['samples']} students: "
+        f"load {result['load_s']:.2f}s, score {result['score_s']:.2f}s."
+    )
+    print(f"{'rank':>4}  {'  '.join(f'{key:>7}' for key in WEIGHT_KEYS)}  {'K':>5}"
+          f"{'MAE':>9}{'RMSE':>9}{'bias':>9}{'ECE':>9}{'MAE adj':>9}")
+    for r in result["ranked"]:
+        weights = "  ".join(f"{r['weights'][key]:>7.3f}" for key in WEIGHT_KEYS)
+        print(f"{r['rank']:>4}  {weights}  {r['k']:>5.2f}"
+              f"{r['mae']:>9.4f}{r['rmse']:>9.4f}{r['bias']:>9.4f}{r['ece']:>9.4f}{r['mae_adjusted']:>9.4f}")
+    if result["saved_version"] is not None:
+        print(f"Saved the best candidate as version {result['saved_version']}"
+              f"{' (active)' if args.activate else ''}.")
+    return 0
+
+
+def cmd_rebuild_stats(args: argparse.Namespace) -> int:
+    import stats_manager
+
+    db_path = args.db or stats_manager.DB_PATH
+    stats_manager.rebuild_stats(db_path)
+    stats = stats_manager.compute_stats(db_path)
+    for param, values in stats.items():
+        print(f"{param}: {values}")
+
+    stats_path = stats_manager.stats_path_for(db_path)
+    if stats_manager.save_stats(stats, stats_path):
+        print(f"Wrote {stats_path}.")
+    return 0
+
+
+def cmd_check_plans(args: argparse.Namespace) -> int:
+    import query_plans
+
+    return query_plans.main([args.db] if args.db else [])
+
+
+def cmd_check_pipeline(args: argparse.Namespace) -> int:
+    import pipeline_check
+
+    return pipeline_check.main([str(args.cases)])
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Maintenance commands for system.db")
+    parser.add_argument("--db", default=None, help="path to the SQLite database (default: system.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("provision", help="create missing default course rows in one transaction (dense storage only)")
+    target = p.add_mutually_exclusive_group()
+    target.add_argument("--student", type=int, default=None, help="only this student id")
+    target.add_argument("--user", type=int, default=None, help="only students of this user id")
+    p.set_defaults(func=cmd_provision)
+
+    p = sub.add_parser("compact-courses", help="drop course rows that are neither enabled nor graded")
+    p.set_defaults(func=cmd_compact_courses)
+
+    p = sub.add_parser("refresh-predictions", help="recompute last_prediction and derived features for all students")
+    p.add_argument("--chunk-size", type=int, default=5000, help="rows per write transaction")
+    p.set_defaults(func=cmd_refresh_predictions)
+
+    p = sub.add_parser("compact-history", help="roll expired history rows into daily aggregates")
+    p.add_argument("--days", type=int, default=None, help="raw rows to keep, in days (default: 90)")
+    p.add_argument("--batch-size", type=int, default=None, help="rows per write transaction (default: 500)")
+    p.add_argument("--max-batches", type=int, default=None, help="stop after this many batches")
+    p.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    p.set_defaults(func=cmd_compact_history)
+
+    p = sub.add_parser("analytics", help="model error, bias and calibration over the prediction history")
+    p.add_argument("--window", choices=model_analytics.WINDOWS, default="month", help="time window for the per-period table")
+    p.add_argument("--bins", type=int, default=model_analytics.CALIBRATION_BINS, help="calibration bins")
+    p.add_argument("--chunk-size", type=int, default=model_analytics.CHUNK_SIZE, help="history rows per fetch")
+    p.add_argument("--json", action="store_true", help="print the report as JSON")
+    p.set_defaults(func=cmd_analytics)
+
+    p = sub.add_parser("train-weights", help="fit the prediction weights to observed outcomes")
+    p.add_argument("--no-activate", action="store_true", help="store the new version without activating it")
+    p.add_argument("--k", type=float, default=None, help="K for the new version (default: keep the active K)")
+    p.set_defaults(func=cmd_train_weights)
+
+    p = sub.add_parser("weights", help="list stored weight sets and switch the active one")
+    target = p.add_mutually_exclusive_group()
+    target.add_argument("--activate", type=int, default=None, metavar="VERSION", help="make this version active")
+    target.add_argument("--builtin", action="store_true", help="deactivate stored versions and use the built-in weights")
+    p.set_defaults(func=cmd_weights)
+
+    p = sub.add_parser("tune-weights", help="grid-search weights and K against observed outcomes")
+    p.add_argument("--step", type=float, default=weight_tuner.GRID_STEP, help="weight grid step (must divide 1)")
+    p.add_argument("--k", default=None, help="comma-separated K values to try")
+    p.add_argument("--rank-by", choices=("mae", "rmse", "ece", "mae_adjusted"), default="mae", help="ranking metric")
+    p.add_argument("--top", type=int, default=20, help="candidates to print")
+    p.add_argument("--save", action="store_true", help="store the best candidate as a new weights version")
+    p.add_argument("--activate", action="store_true", help="store and activate the best candidate")
+    p.set_defaults(func=cmd_tune_weights)
+
+    p = sub.add_parser("rebuild-stats", help="recompute the running parameter statistics exactly and save stats.bin")
+    p.set_defaults(func=cmd_rebuild_stats)
+
+    p = sub.add_parser("check-plans", help="fail if any app query plan regressed to a SCAN")
+    p.set_defaults(func=cmd_check_plans)
+
+    p = sub.add_parser("check-pipeline", help="verify the feature pipeline against the previous predict implementations")
+    p.add_argument("--cases", type=int, default=20000, help="random inputs to compare")
+    p.set_defaults(func=cmd_check_pipeline)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
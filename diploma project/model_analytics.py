@@ -0,0 +1,329 @@
+import os
+import time
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from connection_pool import get_pool
+from schema import HISTORY_EVAL_COLUMNS, ensure_schema
+
+# ------------------------------------------------------------
+# Model Quality Analytics
+# ------------------------------------------------------------
+# Evaluates logged predictions against actual outcomes:
+# MAE, RMSE, bias (mean of prediction - actual), binned calibration,
+# and how much the K-adjusted prediction improves on the initial one,
+# overall, per cohort (the owning user) and per time window.
+#
+# Raw history is streamed in id-ordered chunks of plain tuples
+# straight into NumPy arrays; everything is accumulated with bincount,
+# so memory is bounded by CHUNK_SIZE. Reading a raw row costs about
+# as much as the sqlite3 module needs to build its tuple (roughly
+# 2-3 us), so the raw pass is linear in the retention window.
+# Days rolled into history_daily (see HistoryManager.compact) carry
+# the same error sums; they are grouped by cohort and window in SQL,
+# one row per student-day. Calibration needs per-row predictions and
+# covers the raw rows only.
+# ------------------------------------------------------------
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "system.db")
+
+CHUNK_SIZE = 200_000
+CALIBRATION_BINS = 10
+WINDOWS = ("day", "week", "month")
+
+# Julian day number of 0001-01-01 minus one, for date.fromordinal.
+_JDN_ORDINAL_OFFSET = 1721425
+
+# Window keys are computed by SQLite as integers so no per-row strings
+# reach Python: day and week are Julian day numbers (weeks start on
+# Monday), month is year * 12 + month - 1. {ts} is an ISO timestamp
+# or day column.
+_WINDOW_SQL = {
+    "day": "CAST(julianday(substr({ts}, 1, 10)) + 0.5 AS INTEGER)",
+    "week": "CAST(julianday(substr({ts}, 1, 10)) + 0.5 AS INTEGER) / 7 * 7",
+    "month": "CAST(substr({ts}, 1, 4) AS INTEGER) * 12 + CAST(substr({ts}, 6, 2) AS INTEGER) - 1",
+}
+
+# actual is normalized like prediction_engine.to_01 (values above 1.5
+# are percentages); clipping happens in NumPy.
+_HISTORY_SQL = """
+SELECT
+    h.id,
+    COALESCE(s.user_id, -1),
+    COALESCE({window}, -1),
+    CASE WHEN h.actual > 1.5 THEN h.actual / 100.0 ELSE h.actual END,
+    IFNULL(h.p_initial, 0),
+    h.p_adjusted IS NOT NULL,
+    IFNULL(h.p_adjusted, 0)
+FROM history h
+LEFT JOIN students s ON s.id = h.student_id
+WHERE h.id > ?
+AND typeof(h.actual) IN ('integer', 'real')
+AND typeof(h.p_initial) IN ('integer', 'real')
+ORDER BY h.id
+LIMIT ?;
+"""
+
+# Rolled-up error sums per (cohort, window), columns as in _SUMS.
+_ROLLUP_SQL = f"""
+SELECT
+    COALESCE(s.user_id, -1),
+    COALESCE({{window}}, -1),
+    {", ".join(f"TOTAL(d.{c})" for c in HISTORY_EVAL_COLUMNS)}
+FROM history_daily d
+LEFT JOIN students s ON s.id = d.student_id
+WHERE d.eval_count > 0
+GROUP BY 1, 2;
+"""
+
+# Per-group sums kept by _GroupStats, in column order.
+_SUMS = (
+    "n", "err", "abs", "sq",
+    "n_adj", "err_adj", "abs_adj", "sq_adj", "abs_paired",
+)
+
+
+def history_sql(window: str) -> str:
+    return _HISTORY_SQL.format(window=_WINDOW_SQL[window].format(ts="h.timestamp"))
+
+
+def rollup_sql(window: str) -> str:
+    return _ROLLUP_SQL.format(window=_WINDOW_SQL[window].format(ts="d.day"))
+
+
+def window_label(window: str, key: int) -> str:
+    if key < 0:
+        return "unknown"
+    if window == "month":
+        return f"{key // 12:04d}-{key % 12 + 1:02d}"
+    d = date.fromordinal(key - _JDN_ORDINAL_OFFSET)
+    return d.isoformat() if window == "day" else f"week of {d.isoformat()}"
+
+
+def iter_history_chunks(conn, window: str = "month", chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """
+    Yields (rows, 7) float64 arrays of
+    [id, user_id, window key, actual_n, p_initial, has_adjusted, p_adjusted]
+    for history rows with an actual outcome, in id order.
+    """
+    if window not in _WINDOW_SQL:
+        raise ValueError(f"Unknown window: {window}")
+
+    cur = conn.cursor()
+    cur.row_factory = None
+    sql = history_sql(window)
+
+    last_id = 0
+    while True:
+        rows = cur.execute(sql, (last_id, chunk_size)).fetchall()
+        if not rows:
+            return
+        chunk = np.array(rows, dtype=np.float64)
+        del rows
+        last_id = int(chunk[-1, 0])
+        yield chunk
+        if chunk.shape[0] < chunk_size:
+            return
+
+
+class _GroupStats:
+    """
+    Streaming per-key sums; keys are arbitrary integers.
+    """
+
+    def __init__(self):
+        self.index: Dict[int, int] = {}
+        self.sums = np.zeros((0, len(_SUMS)), dtype=np.float64)
+
+    def _positions(self, keys: np.ndarray) -> Tuple[np.ndarray, int]:
+        uniq, inverse = np.unique(keys.astype(np.int64), return_inverse=True)
+        slots = np.empty(uniq.shape[0], dtype=np.int64)
+        for i, k in enumerate(uniq.tolist()):
+            slot = self.index.get(k)
+            if slot is None:
+                slot = len(self.index)
+                self.index[k] = slot
+            slots[i] = slot
+        size = len(self.index)
+        if size > self.sums.shape[0]:
+            grown = np.zeros((size, len(_SUMS)), dtype=np.float64)
+            grown[:self.sums.shape[0]] = self.sums
+            self.sums = grown
+        return slots[inverse], size
+
+    def add(self, keys: np.ndarray, contributions: np.ndarray) -> None:
+        pos, size = self._positions(keys)
+        for j in range(len(_SUMS)):
+            self.sums[:, j] += np.bincount(pos, weights=contributions[:, j], minlength=size)
+
+    def rows(self, label=str) -> List[Dict[str, Any]]:
+        out = []
+        for key, slot in sorted(self.index.items()):
+            out.append(_metrics(label(key), self.sums[slot]))
+        return out
+
+
+def _contributions(chunk: np.ndarray) -> np.ndarray:
+    actual = np.clip(chunk[:, 3], 0.0, 1.0)
+    err = chunk[:, 4] - actual
+    has_adj = chunk[:, 5]
+    err_adj = (chunk[:, 6] - actual) * has_adj
+
+    out = np.empty((chunk.shape[0], len(_SUMS)), dtype=np.float64)
+    out[:, 0] = 1.0
+    out[:, 1] = err
+    out[:, 2] = np.abs(err)
+    out[:, 3] = err * err
+    out[:, 4] = has_adj
+    out[:, 5] = err_adj
+    out[:, 6] = np.abs(err_adj)
+    out[:, 7] = err_adj * err_adj
+    out[:, 8] = np.abs(err) * has_adj
+    return out
+
+
+def _metrics(key: str, s: np.ndarray) -> Dict[str, Any]:
+    n, n_adj = int(s[0]), int(s[4])
+    row: Dict[str, Any] = {
+        "key": key,
+        "n": n,
+        "mae": s[2] / n if n else None,
+        "rmse": float(np.sqrt(s[3] / n)) if n else None,
+        "bias": s[1] / n if n else None,
+        "n_adjusted": n_adj,
+        "mae_adjusted": s[6] / n_adj if n_adj else None,
+        "rmse_adjusted": float(np.sqrt(s[7] / n_adj)) if n_adj else None,
+        "bias_adjusted": s[5] / n_adj if n_adj else None,
+        # MAE of the initial prediction minus MAE of the adjusted one,
+        # over the rows that have both; positive means adjusting helped.
+        "improvement": (s[8] - s[6]) / n_adj if n_adj else None,
+    }
+    for k, v in row.items():
+        if isinstance(v, np.floating):
+            row[k] = float(v)
+    return row
+
+
+class _Calibration:
+    def __init__(self, bins: int):
+        self.bins = bins
+        self.count = np.zeros(bins, dtype=np.float64)
+        self.sum_p = np.zeros(bins, dtype=np.float64)
+        self.sum_y = np.zeros(bins, dtype=np.float64)
+
+    def add(self, p: np.ndarray, y: np.ndarray) -> None:
+        b = np.clip((np.clip(p, 0.0, 1.0) * self.bins).astype(np.int64), 0, self.bins - 1)
+        self.count += np.bincount(b, minlength=self.bins)
+        self.sum_p += np.bincount(b, weights=p, minlength=self.bins)
+        self.sum_y += np.bincount(b, weights=y, minlength=self.bins)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        out = []
+        for i in range(self.bins):
+            n = int(self.count[i])
+            out.append({
+                "bin": f"{i / self.bins:.2f}-{(i + 1) / self.bins:.2f}",
+                "n": n,
+                "mean_predicted": float(self.sum_p[i] / n) if n else None,
+                "observed": float(self.sum_y[i] / n) if n else None,
+            })
+        return out
+
+
+def analyze(
+    path: str = DB_PATH,
+    window: str = "month",
+    bins: int = CALIBRATION_BINS,
+    chunk_size: int = CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """
+    One pass over the raw history plus one grouped query over the
+    rollups. Returns overall / per-cohort / per-window metrics and
+    calibration tables for the initial and adjusted predictions.
+    """
+    if window not in _WINDOW_SQL:
+        raise ValueError(f"Unknown window: {window}")
+    ensure_schema(path)
+    started = time.perf_counter()
+
+    overall = _GroupStats()
+    cohorts = _GroupStats()
+    windows = _GroupStats()
+    calibration_initial = _Calibration(bins)
+    calibration_adjusted = _Calibration(bins)
+
+    with get_pool(path).connection() as conn:
+        for chunk in iter_history_chunks(conn, window=window, chunk_size=chunk_size):
+            contrib = _contributions(chunk)
+            overall.add(np.zeros(chunk.shape[0]), contrib)
+            cohorts.add(chunk[:, 1], contrib)
+            windows.add(chunk[:, 2], contrib)
+
+            actual = np.clip(chunk[:, 3], 0.0, 1.0)
+            calibration_initial.add(chunk[:, 4], actual)
+            adj = chunk[:, 5] > 0
+            calibration_adjusted.add(chunk[adj, 6], actual[adj])
+
+        cur = conn.cursor()
+        cur.row_factory = None
+        rolled = np.array(cur.execute(rollup_sql(window)).fetchall(), dtype=np.float64)
+    if rolled.shape[0]:
+        sums = rolled[:, 2:]
+        overall.add(np.zeros(rolled.shape[0]), sums)
+        cohorts.add(rolled[:, 0], sums)
+        windows.add(rolled[:, 1], sums)
+    rolled_up = int(rolled[:, 2].sum()) if rolled.shape[0] else 0
+
+    overall_rows = overall.rows(lambda _: "all")
+    return {
+        "window": window,
+        "overall": overall_rows[0] if overall_rows else _metrics("all", np.zeros(len(_SUMS))),
+        "by_cohort": cohorts.rows(lambda k: "unknown" if k < 0 else f"user {k}"),
+        "by_window": windows.rows(lambda k: window_label(window, k)),
+        "calibration": {
+            "initial": calibration_initial.rows(),
+            "adjusted": calibration_adjusted.rows(),
+        },
+        "rolled_up": rolled_up,
+        "elapsed_s": time.perf_counter() - started,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """
+    Plain-text tables for the CLI.
+    """
+    def fmt(v: Optional[float]) -> str:
+        return "—" if v is None else f"{v:.4f}"
+
+    lines = []
+    header = f"{'group':<24}{'n':>10}{'MAE':>10}{'RMSE':>10}{'bias':>10}{'n adj':>10}{'MAE adj':>10}{'improve':>10}"
+
+    def table(title, rows):
+        lines.append(title)
+        lines.append(header)
+        for r in rows:
+            lines.append(
+                f"{r['key']:<24}{r['n']:>10}{fmt(r['mae']):>10}{fmt(r['rmse']):>10}{fmt(r['bias']):>10}"
+                f"{r['n_adjusted']:>10}{fmt(r['mae_adjusted']):>10}{fmt(r['improvement']):>10}"
+            )
+        lines.append("")
+
+    table("Overall", [report["overall"]])
+    table("By cohort", report["by_cohort"])
+    table(f"By {report['window']}", report["by_window"])
+
+    for name in ("initial", "adjusted"):
+        lines.append(f"Calibration ({name}, raw rows only)" if report["rolled_up"] else f"Calibration ({name})")
+        lines.append(f"{'bin':<12}{'n':>10}{'predicted':>12}{'observed':>12}")
+        for r in report["calibration"][name]:
+            lines.append(f"{r['bin']:<12}{r['n']:>10}{fmt(r['mean_predicted']):>12}{fmt(r['observed']):>12}")
+        lines.append("")
+
+    if report["rolled_up"]:
+        lines.append(f"{report['rolled_up']} of {report['overall']['n']} rows come from daily rollups.")
+    lines.append(f"Computed in {report['elapsed_s']:.2f}s.")
+    return "\n".join(lines)
@@ -0,0 +1,90 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from connection_pool import get_pool
+from prediction_engine import K, WEIGHT_KEYS, WEIGHTS, active_model, set_model
+from schema import ensure_schema
+
+# ------------------------------------------------------------
+# Model Store
+# ------------------------------------------------------------
+# Versioned weight sets in the model_weights table. Exactly one row
+# may be active; ModelStore.sync() checks it with one indexed lookup
+# and swaps it into prediction_engine when it changed, so a newly
+# trained or re-activated version goes live without a restart.
+# ------------------------------------------------------------
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "system.db")
+
+ACTIVE_SQL = "SELECT version, alpha, beta, gamma, delta, epsilon, k FROM model_weights WHERE active = 1;"
+SAVE_SQL = """
+INSERT INTO model_weights (alpha, beta, gamma, delta, epsilon, k, source, samples, mae, rmse)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+"""
+EXISTS_SQL = "SELECT 1 FROM model_weights WHERE version = ?;"
+DEACTIVATE_SQL = "UPDATE model_weights SET active = 0 WHERE active = 1;"
+ACTIVATE_SQL = "UPDATE model_weights SET active = 1 WHERE version = ?;"
+VERSIONS_SQL = "SELECT * FROM model_weights ORDER BY version;"
+
+
+def save_weights(conn, weights: Dict[str, float], k: float, source: str = "manual",
+                 samples: int = 0, mae: Optional[float] = None, rmse: Optional[float] = None) -> int:
+    """
+    Stores a new inactive weight set and returns its version.
+    """
+    cur = conn.execute(
+        SAVE_SQL,
+        (*[float(weights[key]) for key in WEIGHT_KEYS], float(k), source, int(samples), mae, rmse),
+    )
+    return int(cur.lastrowid)
+
+
+def activate(conn, version: Optional[int]) -> None:
+    """
+    Makes version the active weight set; None falls back to the built-in weights.
+    """
+    if version is not None:
+        row = conn.execute(EXISTS_SQL, (version,)).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown model weights version: {version}")
+
+    conn.execute(DEACTIVATE_SQL)
+    if version is not None:
+        conn.execute(ACTIVATE_SQL, (version,))
+
+
+def list_versions(conn) -> List[Dict[str, Any]]:
+    return [dict(r) for r in conn.execute(VERSIONS_SQL)]
+
+
+class ModelStore:
+    def __init__(self, path: str = DB_PATH):
+        self.path = os.path.abspath(path)
+        self._pool = get_pool(self.path)
+        self._lock = threading.Lock()
+
+    def sync(self) -> int:
+        """
+        Loads the active weight set into prediction_engine if it changed.
+        Returns the active weights version (0 = built-in).
+        """
+        ensure_schema(self.path)
+        with self._pool.connection() as conn:
+            row = conn.execute(ACTIVE_SQL).fetchone()
+
+        version = int(row["version"]) if row is not None else 0
+        if active_model()[2] == version:
+            return version
+
+        with self._lock:
+            if active_model()[2] != version:
+                if row is None:
+                    set_model(WEIGHTS, K, 0)
+                else:
+                    set_model({key: row[key] for key in WEIGHT_KEYS}, row["k"], version)
+        return version
+
+
+model_store = ModelStore()
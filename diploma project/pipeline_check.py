@@ -0,0 +1,409 @@
+import math
+import os
+import random
+import sys
+import time
+import unittest
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import feature_pipeline
+from prediction_engine import batch_columns, predict, predict_batch
+from prediction_model import compute_prediction
+
+# ------------------------------------------------------------
+# Feature Pipeline Equivalence Check
+# ------------------------------------------------------------
+# Compares prediction_engine.predict / predict_batch and
+# prediction_model.compute_prediction (both now backed by
+# feature_pipeline) against verbatim copies of their previous
+# implementations, on random and edge-case inputs, then times both.
+#
+# Usage: python pipeline_check.py [cases]
+# Exit code is 1 if any result differs; the report flags a pipeline
+# path that is more than SLOWDOWN times slower than its legacy code.
+# As a test: python -m unittest pipeline_check (or pytest pipeline_check.py).
+# The timing comparison is wall clock and only runs as a test with
+# PIPELINE_CHECK_TIMING=1 set.
+# ------------------------------------------------------------
+
+LEGACY_WEIGHTS = {
+    "alpha": 0.35,
+    "beta": 0.25,
+    "gamma": 0.20,
+    "delta": 0.15,
+    "epsilon": 0.05,
+}
+LEGACY_K = 0.9
+
+# Allowed slowdown against the legacy code; generous, since the
+# timings are wall clock.
+SLOWDOWN = 1.25
+TIMING_ENV = "PIPELINE_CHECK_TIMING"
+
+
+# ---------------- previous prediction_engine.predict ----------------
+def _legacy_safe_float(x, default=None):
+    try:
+        if x is None or x == "":
+            return default
+        return float(x)
+    except Exception:
+        return default
+
+
+def _legacy_to_01(x, default=0.0):
+    v = _legacy_safe_float(x, default)
+    if v is None:
+        v = default
+    if v > 1.5:
+        v = v / 100.0
+    return float(np.clip(v, 0.0, 1.0))
+
+
+def _legacy_compute_Ga(student):
+    gcur = _legacy_safe_float(student.get("Gcurrent"))
+    gmin = _legacy_safe_float(student.get("Gmin"))
+    gmax = _legacy_safe_float(student.get("Gmax"))
+    if gcur is None or gmin is None or gmax is None:
+        return None
+    if gmax == gmin:
+        return None
+    ga = (gcur - gmin) / (gmax - gmin)
+    return float(np.clip(ga, 0.0, 1.0))
+
+
+def _legacy_compute_Ar(student, courses):
+    if student is not None and student.get("Ar") not in (None, ""):
+        return _legacy_to_01(student.get("Ar"), default=0.0)
+    if not courses:
+        return 0.0
+    enabled = sum(1 for c in courses if int(c.get("enabled", 0)) == 1)
+    return float(enabled / len(courses))
+
+
+def _legacy_compute_Cp(courses):
+    grades = []
+    for c in courses or []:
+        if int(c.get("enabled", 0)) != 1:
+            continue
+        g = _legacy_safe_float(c.get("grade"))
+        if g is None:
+            continue
+        grades.append(g / 100.0)
+    if not grades:
+        return 0.0
+    cp = sum(grades) / len(grades)
+    return float(np.clip(cp, 0.0, 1.0))
+
+
+def legacy_engine_predict(student, courses):
+    WEIGHTS, K = LEGACY_WEIGHTS, LEGACY_K
+    Ga = _legacy_compute_Ga(student)
+    Cp = _legacy_compute_Cp(courses)
+    Ar = _legacy_compute_Ar(student, courses)
+
+    Ls = _legacy_to_01(student.get("Ls"), default=0.0)
+    Ph = _legacy_to_01(student.get("Ph"), default=0.0)
+
+    actual = _legacy_safe_float(student.get("actual"))
+    actual_n = None if actual is None else _legacy_to_01(actual, default=0.0)
+
+    if Ga is None:
+        Ga = Cp
+
+    Ga = float(np.clip(Ga, 0.0, 1.0))
+    Ar = float(np.clip(Ar, 0.0, 1.0))
+    Cp = float(np.clip(Cp, 0.0, 1.0))
+
+    P_initial = (
+        WEIGHTS["alpha"] * Ga +
+        WEIGHTS["beta"] * Ar +
+        WEIGHTS["gamma"] * Cp +
+        WEIGHTS["delta"] * Ls +
+        WEIGHTS["epsilon"] * Ph
+    )
+    P_initial = float(np.clip(P_initial, 0.0, 1.0))
+
+    if actual_n is None:
+        return P_initial, None, dict(WEIGHTS)
+
+    error = actual_n - P_initial
+    deltaG = error * Ga * abs(error)
+    deltaA = error * Ar * abs(error)
+
+    updated = {
+        "alpha": WEIGHTS["alpha"] * (1 + K * deltaG),
+        "beta": WEIGHTS["beta"] * (1 + K * deltaA),
+        "gamma": WEIGHTS["gamma"],
+        "delta": WEIGHTS["delta"],
+        "epsilon": WEIGHTS["epsilon"],
+    }
+    s = sum(updated.values())
+    if s <= 0:
+        updated = dict(WEIGHTS)
+        s = sum(updated.values())
+    for k in updated:
+        updated[k] = float(updated[k] / s)
+
+    P_adjusted = (
+        updated["alpha"] * Ga +
+        updated["beta"] * Ar +
+        updated["gamma"] * Cp +
+        updated["delta"] * Ls +
+        updated["epsilon"] * Ph
+    )
+    P_adjusted = float(np.clip(P_adjusted, 0.0, 1.0))
+    return P_initial, P_adjusted, updated
+
+
+# ---------------- previous prediction_model.compute_prediction ----------------
+def _legacy_to_float(x):
+    try:
+        if x is None:
+            return None
+        if isinstance(x, (float, int)):
+            return float(x)
+        x = str(x).replace(",", ".")
+        return float(x)
+    except:  # noqa: E722 - kept verbatim
+        return None
+
+
+def legacy_model_prediction(student):
+    WEIGHTS, K = LEGACY_WEIGHTS, LEGACY_K
+    Ga = _legacy_to_float(student.get("Ga"))
+    Ar = _legacy_to_float(student.get("Ar"))
+    Cp = _legacy_to_float(student.get("Cp"))
+    Ls = _legacy_to_float(student.get("Ls"))
+    Ph = _legacy_to_float(student.get("Ph"))
+    actual = _legacy_to_float(student.get("actual"))
+
+    Ga = 0 if Ga is None else Ga
+    Ar = 0 if Ar is None else Ar
+    Cp = 0 if Cp is None else Cp
+    Ls = 0 if Ls is None else Ls
+    Ph = 0 if Ph is None else Ph
+
+    P_initial = (
+        WEIGHTS["alpha"] * Ga +
+        WEIGHTS["beta"] * Ar +
+        WEIGHTS["gamma"] * Cp +
+        WEIGHTS["delta"] * Ls +
+        WEIGHTS["epsilon"] * Ph
+    )
+    P_initial = max(0, min(1, P_initial))
+
+    if actual is None:
+        return P_initial, None, WEIGHTS.copy()
+
+    error = actual - P_initial
+    deltaG = error * Ga
+    deltaA = error * Ar
+
+    new_alpha = WEIGHTS["alpha"] * (1 + K * deltaG)
+    new_beta = WEIGHTS["beta"] * (1 + K * deltaA)
+    new_gamma = WEIGHTS["gamma"]
+    new_delta = WEIGHTS["delta"]
+    new_epsilon = WEIGHTS["epsilon"]
+
+    s = new_alpha + new_beta + new_gamma + new_delta + new_epsilon
+    if s == 0:
+        weights_final = WEIGHTS.copy()
+    else:
+        weights_final = {
+            "alpha": new_alpha / s,
+            "beta": new_beta / s,
+            "gamma": new_gamma / s,
+            "delta": new_delta / s,
+            "epsilon": new_epsilon / s,
+        }
+
+    P_adjusted = (
+        weights_final["alpha"] * Ga +
+        weights_final["beta"] * Ar +
+        weights_final["gamma"] * Cp +
+        weights_final["delta"] * Ls +
+        weights_final["epsilon"] * Ph
+    )
+    P_adjusted = max(0, min(1, P_adjusted))
+    return P_initial, P_adjusted, weights_final
+
+
+# ---------------- inputs ----------------
+_ODD_VALUES = [None, "", "abc", "0,5", "85", 85, 0, 1, 1.5, 1.51, -3, 250, "12.5", True]
+
+
+def _value(rng: random.Random, scale: float) -> Any:
+    r = rng.random()
+    if r < 0.15:
+        return rng.choice(_ODD_VALUES)
+    if r < 0.25:
+        return f"{rng.uniform(0, scale):.3f}"
+    return rng.uniform(-0.1 * scale, 1.1 * scale)
+
+
+def random_student(rng: random.Random) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    gmin = rng.choice([0, 0, 50, None, "x"])
+    gmax = rng.choice([100, 100, 50, None])
+    student = {
+        "Gcurrent": _value(rng, 100),
+        "Gmin": gmin,
+        "Gmax": gmax,
+        "Ar": rng.choice([None, "", _value(rng, 1), _value(rng, 100)]),
+        "Ls": rng.choice([_value(rng, 1), _value(rng, 100)]),
+        "Ph": rng.choice([_value(rng, 1), _value(rng, 100)]),
+        "actual": rng.choice([None, _value(rng, 1), _value(rng, 100)]),
+        # inputs for prediction_model
+        "Ga": _value(rng, 1),
+        "Cp": _value(rng, 1),
+    }
+    courses = [
+        {"enabled": rng.choice([0, 1, 1]), "grade": rng.choice([None, rng.uniform(0, 100), "77", ""])}
+        for _ in range(rng.randint(0, 8))
+    ]
+    return student, courses
+
+
+def _same(a, b) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, float) and math.isnan(a):
+        return isinstance(b, float) and math.isnan(b)
+    return a == b
+
+
+def random_samples(cases: int, seed: int = 7) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    rng = random.Random(seed)
+    return [random_student(rng) for _ in range(cases)]
+
+
+def _time(fns: Dict[str, Callable[[], Any]], repeat: int = 5) -> Dict[str, float]:
+    # Best of repeat runs, interleaved so load spikes hit every function.
+    best = {name: float("inf") for name in fns}
+    for _ in range(repeat):
+        for name, fn in fns.items():
+            started = time.perf_counter()
+            fn()
+            best[name] = min(best[name], time.perf_counter() - started)
+    return best
+
+
+def compare_engine(samples, limit: int = 10) -> List[str]:
+    problems = []
+    for student, courses in samples:
+        if not _same(predict(student, courses), legacy_engine_predict(student, courses)):
+            problems.append(f"engine: {student!r} {courses!r}")
+            if len(problems) >= limit:
+                break
+    return problems
+
+
+def compare_model(samples, limit: int = 10) -> List[str]:
+    problems = []
+    for student, _ in samples:
+        if not _same(compute_prediction(student), legacy_model_prediction(student)):
+            problems.append(f"model: {student!r}")
+            if len(problems) >= limit:
+                break
+    return problems
+
+
+def compare_batch(samples, limit: int = 10) -> List[str]:
+    """
+    predict_batch must agree with predict row for row.
+    """
+    students = [s for s, _ in samples]
+    courses = [c for _, c in samples]
+    p_initial, p_adjusted, weights = predict_batch(batch_columns(students, courses))
+    problems = []
+    for i, (student, course_list) in enumerate(samples):
+        pi, pa, w = predict(student, course_list)
+        pa_b = None if np.isnan(p_adjusted[i]) else float(p_adjusted[i])
+        w_b = dict(zip(feature_pipeline.WEIGHT_KEYS, weights[i].tolist()))
+        if pi != p_initial[i] or not _same(pa, pa_b) or not _same(w, w_b):
+            problems.append(f"batch row {i}: {student!r}")
+            if len(problems) >= limit:
+                break
+    return problems
+
+
+def timings(samples, repeat: int = 5) -> Dict[str, float]:
+    """
+    Microseconds per call (per row for the batch) of each implementation.
+    """
+    students = [s for s, _ in samples]
+    columns = batch_columns(students, [c for _, c in samples])
+    best = _time({
+        "engine_legacy_us": lambda: [legacy_engine_predict(s, c) for s, c in samples],
+        "engine_pipeline_us": lambda: [predict(s, c) for s, c in samples],
+        "model_legacy_us": lambda: [legacy_model_prediction(s) for s in students],
+        "model_pipeline_us": lambda: [compute_prediction(s) for s in students],
+        "batch_pipeline_us": lambda: predict_batch(columns),
+    }, repeat)
+    return {name: seconds / len(samples) * 1e6 for name, seconds in best.items()}
+
+
+def check(cases: int = 20000, seed: int = 7) -> Tuple[List[str], Dict[str, float]]:
+    """
+    Returns (mismatch descriptions, timings in microseconds).
+    """
+    samples = random_samples(cases, seed)
+    problems = compare_engine(samples) + compare_model(samples)
+    problems += compare_batch(samples)
+    return problems[:10], timings(samples)
+
+
+def slow_paths(t: Dict[str, float], slowdown: float = SLOWDOWN) -> List[str]:
+    """
+    Names of the pipeline paths more than slowdown times slower than legacy.
+    """
+    return [
+        name for name in ("engine", "model")
+        if t[f"{name}_pipeline_us"] > t[f"{name}_legacy_us"] * slowdown
+    ]
+
+
+class PipelineCheckTest(unittest.TestCase):
+    CASES = 5000
+
+    @classmethod
+    def setUpClass(cls):
+        cls.samples = random_samples(cls.CASES)
+
+    def test_engine_matches_legacy(self):
+        self.assertEqual(compare_engine(self.samples), [])
+
+    def test_model_matches_legacy(self):
+        self.assertEqual(compare_model(self.samples), [])
+
+    def test_batch_matches_predict(self):
+        self.assertEqual(compare_batch(self.samples), [])
+
+    @unittest.skipUnless(os.environ.get(TIMING_ENV), f"wall-clock timing; set {TIMING_ENV}=1 to run")
+    def test_not_slower_than_legacy(self):
+        self.assertEqual(slow_paths(timings(self.samples[:2000], repeat=10)), [])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    cases = int(argv[0]) if argv else 20000
+
+    problems, timings = check(cases)
+    for problem in problems:
+        print(f"MISMATCH {problem}")
+
+    print(f"Per call: engine {timings['engine_legacy_us']:.1f}us -> {timings['engine_pipeline_us']:.1f}us, "
+          f"model {timings['model_legacy_us']:.1f}us -> {timings['model_pipeline_us']:.1f}us, "
+          f"batch {timings['batch_pipeline_us']:.2f}us per row.")
+    for name in slow_paths(timings):
+        print(f"SLOW {name}: pipeline is more than {SLOWDOWN}x slower than the legacy code")
+    print(f"Checked {cases} cases, {len(problems)} mismatches.")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
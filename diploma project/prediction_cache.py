@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from course_catalog import catalog
+from model_store import model_store
+from prediction_engine import model_version, predict
+
+# ------------------------------------------------------------
+# Prediction Cache
+# ------------------------------------------------------------
+# LRU of predict() results keyed by
+# (student_id, students.data_version, model version, catalog version).
+# The model version is read from prediction_engine, which set_model()
+# updates in-process. The active weight set (model_weights) and the
+# catalog version are revalidated against the database at most every
+# VERSION_TTL seconds, or on the next lookup after invalidate(), so a
+# hit costs no database round trip.
+# data_version is bumped by triggers on every student, course or plan
+# change, so entries never need explicit invalidation: a changed
+# student simply gets a new key and the old entry ages out.
+# ------------------------------------------------------------
+
+MAX_ENTRIES = 4096
+VERSION_TTL = 2.0
+
+CacheKey = Tuple[int, int, int, int]
+Prediction = Tuple[float, Optional[float], Dict[str, float]]
+
+
+class PredictionCache:
+    def __init__(self, max_entries: int = MAX_ENTRIES, version_ttl: float = VERSION_TTL):
+        self.max_entries = max_entries
+        self.version_ttl = version_ttl
+        self._entries: "OrderedDict[CacheKey, Prediction]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._catalog_version = 0
+        self._checked_at: Optional[float] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _revalidate(self) -> int:
+        """
+        Syncs the active weights and returns the catalog version, hitting
+        the database only when the last check is older than version_ttl.
+        """
+        now = time.monotonic()
+        checked_at = self._checked_at
+        if checked_at is None or now - checked_at >= self.version_ttl:
+            model_store.sync()
+            self._catalog_version = catalog.get().version
+            self._checked_at = now
+        return self._catalog_version
+
+    def invalidate(self) -> None:
+        """
+        Forces the next lookup to re-read the weights and catalog versions.
+        """
+        self._checked_at = None
+
+    def key_for(self, student: Dict[str, Any]) -> CacheKey:
+        catalog_version = self._revalidate()
+        return (
+            int(student["id"]),
+            int(student.get("data_version") or 0),
+            model_version(),
+            catalog_version,
+        )
+
+    def get(self, key: CacheKey) -> Optional[Prediction]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: CacheKey, value: Prediction) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def predict(self, student: Dict[str, Any], load_courses: Callable[[], List[Dict[str, Any]]]) -> Prediction:
+        """
+        Cached predict(student, courses). load_courses is only called on a miss.
+        """
+        key = self.key_for(student)
+        cached = self.get(key)
+        if cached is None:
+            cached = predict(student, load_courses())
+            self.put(key, cached)
+
+        p_initial, p_adjusted, weights = cached
+        return p_initial, p_adjusted, dict(weights)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
+
+
+prediction_cache = PredictionCache()
@@ -2,15 +2,38 @@ from __future__ import annotations
 
 import numpy as np
 
-WEIGHTS = {
-    "alpha": 0.35,   # Ga
-    "beta": 0.25,    # Ar
-    "gamma": 0.20,   # Cp
-    "delta": 0.15,   # Ls
-    "epsilon": 0.05  # Ph
-}
+from feature_pipeline import K, WEIGHT_KEYS, WEIGHTS, engine_strategy, score_arrays, weights_dict
 
-K = 0.9
+# Bump when the formula changes, so cached results expire.
+MODEL_VERSION = 1
+
+# Active (weights, K, weights version, pipeline strategy). Version 0
+# is the built-in WEIGHTS / K; trained versions are swapped in at
+# runtime by model_store.ModelStore.sync() through set_model().
+_active = (dict(WEIGHTS), K, 0, engine_strategy(WEIGHTS, K))
+
+
+def set_model(weights, k, version) -> None:
+    """
+    Replaces the active weights and K in one assignment, so a concurrent
+    predict() sees either the old or the new model, never a mix.
+    """
+    global _active
+    weights = {key: float(weights[key]) for key in WEIGHT_KEYS}
+    _active = (weights, float(k), int(version), engine_strategy(weights, k))
+
+
+def active_model():
+    """
+    Returns (weights, K, weights version) currently used by predict().
+    """
+    weights, k, version, _ = _active
+    return dict(weights), k, version
+
+
+def model_version() -> int:
+    # Changes whenever either the formula or the active weights change.
+    return MODEL_VERSION * 1_000_000 + _active[2]
 
 
 def safe_float(x, default=None):
@@ -73,66 +96,125 @@ def compute_Cp(courses) -> float:
 
 
 def predict(student, courses):
-    Ga = compute_Ga(student)
-    Cp = compute_Cp(courses)
-    Ar = compute_Ar(student, courses)
-
-    Ls = to_01(student.get("Ls"), default=0.0)
-    Ph = to_01(student.get("Ph"), default=0.0)
-
-    actual = safe_float(student.get("actual"))
-    actual_n = None if actual is None else to_01(actual, default=0.0)
-
-    if Ga is None:
-        Ga = Cp
-
-    Ga = float(np.clip(Ga, 0.0, 1.0))
-    Ar = float(np.clip(Ar, 0.0, 1.0))
-    Cp = float(np.clip(Cp, 0.0, 1.0))
-
-    P_initial = (
-        WEIGHTS["alpha"] * Ga +
-        WEIGHTS["beta"]  * Ar +
-        WEIGHTS["gamma"] * Cp +
-        WEIGHTS["delta"] * Ls +
-        WEIGHTS["epsilon"] * Ph
+    # One pass over the courses gives Cp and the Ar fallback, as in
+    # predict_batch; the strategy clips them, so the values match
+    # compute_Cp / compute_Ar.
+    get = student.get
+    grade_sum, grade_count, enabled, course_count = course_aggregates(courses)
+    Cp = grade_sum / grade_count if grade_count else 0.0
+
+    Ar = get("Ar")
+    if Ar is None or Ar == "":
+        Ar = enabled / course_count if course_count else 0.0
+    else:
+        Ar = to_01(Ar)
+
+    p_initial, p_adjusted, weights = _active[3].scalar(
+        compute_Ga(student), Ar, Cp, get("Ls"), get("Ph"), get("actual"),
     )
-    P_initial = float(np.clip(P_initial, 0.0, 1.0))
-
-    if actual_n is None:
-        return P_initial, None, dict(WEIGHTS)
+    return p_initial, p_adjusted, weights_dict(weights)
 
-    error = actual_n - P_initial
 
-    deltaG = error * Ga * abs(error)
-    deltaA = error * Ar * abs(error)
+# ------------------------------------------------------------
+# Vectorized cohort scoring
+# ------------------------------------------------------------
+BATCH_FIELDS = (
+    "Gcurrent", "Gmin", "Gmax", "Ar", "Ls", "Ph", "actual",
+    "grade_sum", "grade_count", "enabled_count", "course_count",
+)
 
-    new_alpha = WEIGHTS["alpha"] * (1 + K * deltaG)
-    new_beta = WEIGHTS["beta"] * (1 + K * deltaA)
 
-    updated = {
-        "alpha": new_alpha,
-        "beta": new_beta,
-        "gamma": WEIGHTS["gamma"],
-        "delta": WEIGHTS["delta"],
-        "epsilon": WEIGHTS["epsilon"],
-    }
-
-    s = sum(updated.values())
-    if s <= 0:
-        updated = dict(WEIGHTS)
-        s = sum(updated.values())
-
-    for k in updated:
-        updated[k] = float(updated[k] / s)
-
-    P_adjusted = (
-        updated["alpha"] * Ga +
-        updated["beta"]  * Ar +
-        updated["gamma"] * Cp +
-        updated["delta"] * Ls +
-        updated["epsilon"] * Ph
-    )
-    P_adjusted = float(np.clip(P_adjusted, 0.0, 1.0))
-
-    return P_initial, P_adjusted, updated
+def course_aggregates(courses):
+    """
+    Per-student course inputs for predict_batch, summed in the same order
+    as compute_Cp / compute_Ar so results match predict exactly.
+    Returns (grade_sum, grade_count, enabled_count, course_count).
+    """
+    grades = []
+    enabled = 0
+    for c in courses or []:
+        if int(c.get("enabled", 0)) != 1:
+            continue
+        enabled += 1
+        g = safe_float(c.get("grade"))
+        if g is None:
+            continue
+        grades.append(g / 100.0)
+    return float(sum(grades)), len(grades), enabled, len(courses or [])
+
+
+def batch_columns(students, courses_per_student):
+    """
+    Builds predict_batch input columns from student dicts and their course
+    lists. Missing or unparsable values become NaN.
+    """
+    n = len(students)
+    cols = {name: np.full(n, np.nan, dtype=np.float64) for name in BATCH_FIELDS}
+    for i, (student, courses) in enumerate(zip(students, courses_per_student)):
+        for name in ("Gcurrent", "Gmin", "Gmax", "Ar", "Ls", "Ph", "actual"):
+            v = safe_float(student.get(name))
+            if v is not None:
+                cols[name][i] = v
+        # A present but unparsable Ar counts as 0 in compute_Ar; NaN
+        # would select the enabled-course fallback instead.
+        if np.isnan(cols["Ar"][i]) and student.get("Ar") not in (None, ""):
+            cols["Ar"][i] = 0.0
+        (cols["grade_sum"][i], cols["grade_count"][i],
+         cols["enabled_count"][i], cols["course_count"][i]) = course_aggregates(courses)
+    return cols
+
+
+def _to_01_array(v):
+    v = np.where(np.isnan(v), 0.0, v)
+    v = np.where(v > 1.5, v / 100.0, v)
+    return np.clip(v, 0.0, 1.0)
+
+
+def batch_features(columns):
+    """
+    Vectorized feature extraction shared by predict_batch and the offline
+    jobs. Returns (Ga, Ar, Cp, Ls, Ph, actual_n, has_actual), the same values
+    predict() works with after normalization and clipping.
+    """
+    col = {name: np.asarray(columns[name], dtype=np.float64) for name in BATCH_FIELDS}
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gcur, gmin, gmax = col["Gcurrent"], col["Gmin"], col["Gmax"]
+        ga_valid = ~(np.isnan(gcur) | np.isnan(gmin) | np.isnan(gmax)) & (gmax != gmin)
+        Ga = np.clip((gcur - gmin) / (gmax - gmin), 0.0, 1.0)
+
+        grade_count = col["grade_count"]
+        Cp = np.where(grade_count > 0, np.clip(col["grade_sum"] / grade_count, 0.0, 1.0), 0.0)
+
+        course_count = col["course_count"]
+        Ar_fallback = np.where(course_count > 0, col["enabled_count"] / course_count, 0.0)
+    Ar = np.where(np.isnan(col["Ar"]), Ar_fallback, _to_01_array(col["Ar"]))
+
+    Ls = _to_01_array(col["Ls"])
+    Ph = _to_01_array(col["Ph"])
+
+    Ga = np.clip(np.where(ga_valid, Ga, Cp), 0.0, 1.0)
+    Ar = np.clip(Ar, 0.0, 1.0)
+    Cp = np.clip(Cp, 0.0, 1.0)
+
+    has_actual = ~np.isnan(col["actual"])
+    actual_n = _to_01_array(col["actual"])
+
+    return Ga, Ar, Cp, Ls, Ph, actual_n, has_actual
+
+
+def predict_batch(columns):
+    """
+    Scores a whole cohort in one vectorized pass.
+
+    columns: dict of equal-length arrays (or a structured array) with the
+    BATCH_FIELDS; NaN marks a missing value. grade_sum / grade_count are the
+    enabled, graded courses (grade / 100 summed), enabled_count / course_count
+    feed the Ar fallback, as in compute_Ar.
+
+    Returns (p_initial, p_adjusted, weights): p_adjusted is NaN where actual is
+    missing, weights is an (N, 5) array in WEIGHT_KEYS order. Each row matches
+    predict() for the same student bit for bit.
+    """
+    Ga, Ar, Cp, Ls, Ph, actual_n, has_actual = batch_features(columns)
+    return score_arrays(_active[3], Ga, Ar, Cp, Ls, Ph, np.where(has_actual, actual_n, np.nan))
@@ -0,0 +1,129 @@
+import os
+import time
+from typing import Dict, Tuple
+
+import numpy as np
+
+from connection_pool import get_pool
+from model_store import ModelStore
+from prediction_engine import batch_features, predict_batch, safe_float
+from schema import ensure_schema
+
+# ------------------------------------------------------------
+# Prediction Refresh Job
+# ------------------------------------------------------------
+# Recomputes students.last_prediction and the derived Ga / Cp
+# features for the whole cohort:
+# 1) read all students and their enabled-course grade aggregates
+#    in a few set-based queries,
+# 2) score them with predict_batch,
+# 3) write back with executemany in chunked transactions.
+# Ar, Ls and Ph are user inputs and are not overwritten.
+# ------------------------------------------------------------
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "system.db")
+
+CHUNK_SIZE = 5000
+
+STUDENT_COLUMNS = ("Gcurrent", "Gmin", "Gmax", "Ar", "Ls", "Ph", "actual")
+
+LOAD_STUDENTS_SQL = f"SELECT id, {', '.join(STUDENT_COLUMNS)} FROM students ORDER BY id;"
+COURSE_COUNT_SQL = "SELECT COUNT(*) FROM courses;"
+COURSE_AGGREGATES_SQL = """
+SELECT
+    student_id,
+    COUNT(*),
+    COUNT(grade),
+    TOTAL(grade / 100.0)
+FROM student_courses
+WHERE enabled = 1 AND course_id IS NOT NULL
+GROUP BY student_id;
+"""
+WRITE_SQL = "UPDATE students SET Ga = ?, Cp = ?, last_prediction = ? WHERE id = ?;"
+
+
+def _float_column(values) -> np.ndarray:
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        out = [safe_float(v) for v in values]
+        return np.array([np.nan if v is None else v for v in out], dtype=np.float64)
+
+
+def load_cohort(conn) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Returns (student ids, predict_batch columns) for every student.
+    Grades are summed by SQLite, so Cp can differ from predict() in the
+    last bit when a student has several graded courses.
+    """
+    cur = conn.cursor()
+    cur.row_factory = None
+
+    rows = cur.execute(LOAD_STUDENTS_SQL).fetchall()
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+
+    columns: Dict[str, np.ndarray] = {}
+    for i, name in enumerate(STUDENT_COLUMNS, start=1):
+        columns[name] = _float_column([r[i] for r in rows])
+    del rows
+
+    n = ids.shape[0]
+    for name in ("grade_sum", "grade_count", "enabled_count"):
+        columns[name] = np.zeros(n, dtype=np.float64)
+
+    # The per-student course view covers the whole catalog.
+    course_count = cur.execute(COURSE_COUNT_SQL).fetchone()[0]
+    columns["course_count"] = np.full(n, float(course_count))
+
+    agg = cur.execute(COURSE_AGGREGATES_SQL).fetchall()
+    if agg and n:
+        agg_arr = np.array(agg, dtype=np.float64)
+        pos = np.searchsorted(ids, agg_arr[:, 0].astype(np.int64))
+        pos = np.clip(pos, 0, n - 1)
+        known = ids[pos] == agg_arr[:, 0].astype(np.int64)
+        columns["enabled_count"][pos[known]] = agg_arr[known, 1]
+        columns["grade_count"][pos[known]] = agg_arr[known, 2]
+        columns["grade_sum"][pos[known]] = agg_arr[known, 3]
+
+    return ids, columns
+
+
+def refresh_predictions(path: str = DB_PATH, chunk_size: int = CHUNK_SIZE) -> Dict[str, float]:
+    """
+    Scores every student and stores Ga, Cp and last_prediction
+    (adjusted when an actual outcome exists, otherwise initial).
+    Returns timing counters.
+    """
+    ensure_schema(path)
+    ModelStore(path).sync()
+    pool = get_pool(path)
+    started = time.perf_counter()
+
+    with pool.connection() as conn:
+        ids, columns = load_cohort(conn)
+    loaded = time.perf_counter()
+
+    Ga, _, Cp, _, _, _, _ = batch_features(columns)
+    p_initial, p_adjusted, _ = predict_batch(columns)
+    last = np.where(np.isnan(p_adjusted), p_initial, p_adjusted)
+    scored = time.perf_counter()
+
+    for start in range(0, ids.shape[0], chunk_size):
+        stop = start + chunk_size
+        batch = zip(
+            Ga[start:stop].tolist(),
+            Cp[start:stop].tolist(),
+            last[start:stop].tolist(),
+            ids[start:stop].tolist(),
+        )
+        with pool.transaction() as conn:
+            conn.executemany(WRITE_SQL, batch)
+    written = time.perf_counter()
+
+    return {
+        "students": float(ids.shape[0]),
+        "load_s": loaded - started,
+        "score_s": scored - loaded,
+        "write_s": written - scored,
+    }
@@ -0,0 +1,114 @@
+from typing import Dict, Iterable, List, Set
+
+# ------------------------------------------------------------
+# Prerequisite Graph
+# ------------------------------------------------------------
+# Built once per catalog version from course_prerequisites.
+# Every course gets a bit position; closure[c] is the bitmask of all
+# direct and transitive prerequisites of c, so "can the student take
+# c?" is a single mask test against the student's passed courses.
+# ------------------------------------------------------------
+
+
+class PrerequisiteCycleError(ValueError):
+    pass
+
+
+class PrerequisiteGraph:
+    def __init__(self, course_ids: Iterable[int], prerequisites: Dict[int, Set[int]]):
+        nodes = set(int(c) for c in course_ids)
+        for course_id, reqs in prerequisites.items():
+            nodes.add(int(course_id))
+            nodes.update(int(r) for r in reqs)
+
+        self.ids: List[int] = sorted(nodes)
+        self.bit: Dict[int, int] = {cid: 1 << i for i, cid in enumerate(self.ids)}
+
+        self.direct: Dict[int, int] = {cid: 0 for cid in self.ids}
+        self.direct_ids: Dict[int, List[int]] = {cid: [] for cid in self.ids}
+        self.unlocks: Dict[int, Set[int]] = {cid: set() for cid in self.ids}
+        for course_id, reqs in prerequisites.items():
+            course_id = int(course_id)
+            for r in set(int(r) for r in reqs):
+                self.direct[course_id] |= self.bit[r]
+                self.direct_ids[course_id].append(r)
+                self.unlocks[r].add(course_id)
+
+        self.order: List[int] = self._topological_order()
+        self.closure: Dict[int, int] = self._transitive_closure()
+        self.cyclic: Set[int] = {cid for cid in self.ids if self.closure[cid] & self.bit[cid]}
+
+    def _topological_order(self) -> List[int]:
+        """
+        Kahn's algorithm; prerequisites come before the courses they unlock.
+        Courses on or behind a cycle are left out.
+        """
+        indegree = {cid: len(self.direct_ids[cid]) for cid in self.ids}
+        ready = [cid for cid in self.ids if indegree[cid] == 0]
+        order: List[int] = []
+
+        while ready:
+            cid = ready.pop()
+            order.append(cid)
+            for nxt in self.unlocks[cid]:
+                indegree[nxt] -= 1
+                if indegree[nxt] == 0:
+                    ready.append(nxt)
+
+        return order
+
+    def _transitive_closure(self) -> Dict[int, int]:
+        closure: Dict[int, int] = {}
+        for cid in self.order:
+            mask = self.direct[cid]
+            for r in self.direct_ids[cid]:
+                mask |= closure[r]
+            closure[cid] = mask
+
+        # Courses outside the topological order sit on or behind a
+        # cycle; settle them by iterating to a fixed point.
+        pending = [cid for cid in self.ids if cid not in closure]
+        for cid in pending:
+            closure[cid] = self.direct[cid]
+        changed = bool(pending)
+        while changed:
+            changed = False
+            for cid in pending:
+                mask = closure[cid]
+                for r in self.direct_ids[cid]:
+                    mask |= closure[r]
+                if mask != closure[cid]:
+                    closure[cid] = mask
+                    changed = True
+
+        return closure
+
+    def requirements(self, mask: int) -> List[int]:
+        """
+        Course ids whose bits are set in mask.
+        """
+        out = []
+        while mask:
+            low = mask & -mask
+            out.append(self.ids[low.bit_length() - 1])
+            mask ^= low
+        return out
+
+    def mask(self, course_ids: Iterable[int]) -> int:
+        m = 0
+        for cid in course_ids:
+            m |= self.bit.get(int(cid), 0)
+        return m
+
+    def satisfied(self, course_id: int, passed_mask: int) -> bool:
+        """
+        True if every direct and transitive prerequisite is in passed_mask.
+        """
+        return (self.closure.get(course_id, 0) & ~passed_mask) == 0
+
+    def missing(self, course_id: int, passed_mask: int) -> List[int]:
+        return self.requirements(self.closure.get(course_id, 0) & ~passed_mask)
+
+    def check_acyclic(self) -> None:
+        if self.cyclic:
+            raise PrerequisiteCycleError(f"Prerequisite cycle through courses {sorted(self.cyclic)}")
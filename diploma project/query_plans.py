@@ -0,0 +1,206 @@
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import course_catalog
+import database
+import history_manager
+import history_writer
+import model_analytics
+import model_store
+import prediction_refresh
+import schema
+import stats_manager
+import weight_training
+from connection_pool import DB_PATH, get_pool
+from schema import ensure_schema
+
+# ------------------------------------------------------------
+# Query Plan Regression Check
+# ------------------------------------------------------------
+# Runs EXPLAIN QUERY PLAN over every statement the app issues and
+# reports any that fall back to a full table or index SCAN.
+# The statements are the SQL constants of the modules that run them,
+# so a changed query is checked as written; a new query belongs in a
+# module constant and in QUERIES. Trigger bodies are read from
+# sqlite_master, so every installed trigger is checked too.
+#
+# Usage: python query_plans.py [path/to/system.db]
+# Exit code is 1 if any statement regressed to a SCAN.
+# As a test: python -m unittest query_plans (or pytest query_plans.py);
+# it checks a freshly migrated temporary database.
+# ------------------------------------------------------------
+
+AllowScan = Union[bool, Tuple[str, ...]]
+
+# (name, sql, allow_scan). allow_scan is True for statements that are
+# intentionally O(table), or a tuple of table aliases that may be
+# scanned because they are the small course catalog.
+QUERIES: List[Tuple[str, str, AllowScan]] = [
+    # database.Database
+    ("get_user", database.GET_USER_SQL, False),
+    ("add_user", database.ADD_USER_SQL, False),
+    ("add_student", database.ADD_STUDENT_SQL, False),
+    ("list_students", database.LIST_STUDENTS_SQL, False),
+    ("get_student", database.GET_STUDENT_SQL, False),
+    ("update_student", database.UPDATE_STUDENT_SQL.format(columns="Gcurrent=?"), False),
+    ("delete_student_courses", database.DELETE_STUDENT_COURSES_SQL, False),
+    ("delete_student_plan", database.DELETE_STUDENT_PLAN_SQL, False),
+    ("delete_student", database.DELETE_STUDENT_SQL, False),
+    ("get_all_courses", database.ALL_COURSES_SQL, True),
+    ("get_prerequisites", database.PREREQUISITES_SQL, False),
+    ("get_student_plan", database.STUDENT_PLAN_SQL, False),
+    ("add_to_plan", database.ADD_TO_PLAN_SQL, False),
+    ("remove_from_plan", database.REMOVE_FROM_PLAN_SQL, False),
+    ("clear_plan", database.CLEAR_PLAN_SQL, False),
+
+    # schema helpers shared by database.Database and course_manager.CourseManager
+    ("provision_student_courses", schema.PROVISION_STUDENT_COURSES_SQL.format(
+        courses=", ".join("?" for _ in schema.DEFAULT_COURSES),
+        where="AND s.user_id = ?",
+    ), False),
+    ("get_student_courses", schema.STUDENT_COURSES_SQL, ("c",)),
+    ("update_course", schema.UPDATE_COURSE_SQL, False),
+    ("set_student_course_delete", schema.DELETE_STUDENT_COURSE_SQL, False),
+    ("set_student_course_upsert", schema.UPSERT_STUDENT_COURSE_SQL, False),
+    ("compact_student_courses", schema.COMPACT_STUDENT_COURSES_SQL, True),
+
+    # course_catalog.CourseCatalog
+    ("catalog_version", course_catalog.VERSION_SQL, False),
+    ("catalog_courses", course_catalog.COURSES_SQL, True),
+    ("catalog_prerequisites", course_catalog.PREREQUISITES_SQL, True),
+
+    # prediction_refresh
+    ("refresh_load_students", prediction_refresh.LOAD_STUDENTS_SQL, True),
+    ("refresh_course_count", prediction_refresh.COURSE_COUNT_SQL, True),
+    ("refresh_course_aggregates", prediction_refresh.COURSE_AGGREGATES_SQL, True),
+    ("refresh_write", prediction_refresh.WRITE_SQL, False),
+
+    # history_manager.HistoryManager / history_writer.HistoryWriter
+    ("add_history_record", history_writer.INSERT_SQL, False),
+    ("get_history", history_manager.HISTORY_SQL, False),
+    ("get_daily_history", history_manager.DAILY_HISTORY_SQL, False),
+    ("compact_history_rollup", schema.HISTORY_ROLLUP_SQL, ("history_daily",)),
+    ("compact_history_delete", schema.HISTORY_DELETE_EXPIRED_SQL, False),
+
+    # model_analytics
+    ("analytics_history_chunk", model_analytics.history_sql("month"), False),
+    ("analytics_rollups", model_analytics.rollup_sql("month"), True),
+
+    # model_store / weight_training
+    ("active_model_weights", model_store.ACTIVE_SQL, False),
+    ("save_model_weights", model_store.SAVE_SQL, False),
+    ("model_weights_exists", model_store.EXISTS_SQL, False),
+    ("deactivate_model_weights", model_store.DEACTIVATE_SQL, False),
+    ("activate_model_weights", model_store.ACTIVATE_SQL, False),
+    ("list_model_weights", model_store.VERSIONS_SQL, True),
+    ("latest_history_actual", weight_training.LATEST_HISTORY_ACTUAL_SQL, True),
+
+    # stats_manager
+    ("compute_stats", stats_manager.PARAM_STATS_SQL, True),
+] + [
+    (f"refresh_stale_extremes_{p}", schema.REFRESH_EXTREMES_SQL.format(param=p, numeric=schema._numeric(p)), True)
+    for p in schema.STATS_PARAMETERS
+]
+
+# Tables a trigger may scan: single-row or one-row-per-parameter
+# bookkeeping tables, plus the small course catalog.
+TRIGGER_SCAN_TABLES = ("param_stats", "catalog_version", "courses")
+
+
+def trigger_statements(conn: sqlite3.Connection) -> List[Tuple[str, str, AllowScan]]:
+    """
+    Returns the statements in the body of every installed trigger, with
+    NEW./OLD. column references bound as parameters.
+    """
+    statements = []
+    rows = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' ORDER BY name;")
+    for name, sql in rows:
+        body = re.search(r"\bBEGIN\b(.*)\bEND\s*$", sql, re.S | re.I)
+        if body is None:
+            continue
+        parts = [p.strip() for p in body.group(1).split(";") if p.strip()]
+        for i, part in enumerate(parts, start=1):
+            label = name if len(parts) == 1 else f"{name}[{i}]"
+            statements.append((label, re.sub(r"\b(?:NEW|OLD)\.\w+", "?", part), TRIGGER_SCAN_TABLES))
+    return statements
+
+
+def explain(conn: sqlite3.Connection, sql: str) -> List[str]:
+    """
+    Returns the plan detail lines for a statement, binding dummy parameters.
+    """
+    params: Union[Sequence[Any], Dict[str, Any]] = (1,) * sql.count("?")
+    named = re.findall(r":(\w+)", sql)
+    if named:
+        params = {name: 1 for name in named}
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return [str(r[3]) for r in rows]
+
+
+def is_scan(detail: str, allowed: Tuple[str, ...] = ()) -> bool:
+    if not detail.startswith("SCAN ") or detail.startswith("SCAN CONSTANT ROW"):
+        return False
+    return detail.split()[1] not in allowed
+
+
+def find_scans(conn: sqlite3.Connection, queries=QUERIES) -> List[Tuple[str, str]]:
+    """
+    Returns (query name, plan detail) for every unexpected SCAN.
+    """
+    problems = []
+    for name, sql, allow_scan in queries:
+        if allow_scan is True:
+            continue
+        allowed = allow_scan or ()
+        for detail in explain(conn, sql):
+            if is_scan(detail, allowed):
+                problems.append((name, detail))
+    return problems
+
+
+class QueryPlanTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp(prefix="query_plans-")
+        cls.path = os.path.join(cls.tmp_dir, "system.db")
+        ensure_schema(cls.path)
+        cls.conn = sqlite3.connect(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+        get_pool(cls.path).close_all()
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def test_queries_use_indexes(self):
+        self.assertEqual(find_scans(self.conn), [])
+
+    def test_triggers_use_indexes(self):
+        triggers = trigger_statements(self.conn)
+        self.assertTrue(triggers)
+        self.assertEqual(find_scans(self.conn, triggers), [])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else DB_PATH
+
+    ensure_schema(path)
+    with get_pool(path).connection() as conn:
+        queries = QUERIES + trigger_statements(conn)
+        problems = find_scans(conn, queries)
+
+    for name, detail in problems:
+        print(f"{name}: {detail}")
+    print(f"Checked {len(queries)} statements, {len(problems)} regressed to SCAN.")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,785 @@
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Iterable, List, Optional, Set, Tuple
+
+from connection_pool import get_pool
+
+# ------------------------------------------------------------
+# Schema Module
+# ------------------------------------------------------------
+# Versioned migrations for system.db plus the course catalog seed.
+# Both run once per process at startup (ensure_schema); request
+# handlers never issue DDL or repair writes.
+# Applied versions are recorded in the schema_version table.
+# ------------------------------------------------------------
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "system.db")
+
+DEFAULT_COURSES = [
+    "Mathematics",
+    "Probability and Statistics",
+    "Programming",
+    "Discrete Structures",
+    "Databases",
+    "Algorithms",
+    "Computer Architecture",
+    "Linear Algebra",
+]
+
+# Sparse storage keeps only student_courses rows that are enabled or
+# graded; the full per-student catalog view is synthesized on read
+# (STUDENT_COURSES_SQL). Dense storage materializes a row per default
+# course for every student.
+SPARSE_STUDENT_COURSES = True
+
+# Student columns tracked by the param_stats running statistics.
+STATS_PARAMETERS = ("Ga", "Ar", "Cp", "Ls", "Ph")
+
+STUDENT_COURSES_SQL = """
+SELECT
+    sc.id AS id,
+    :student_id AS student_id,
+    c.name AS course_name,
+    c.name AS name,
+    COALESCE(sc.enabled, 0) AS enabled,
+    sc.grade AS grade,
+    c.id AS course_id,
+    c.difficulty AS difficulty
+FROM courses c
+LEFT JOIN student_courses sc
+    ON sc.student_id = :student_id AND sc.course_id = c.id
+ORDER BY c.name;
+"""
+
+
+# Oldest expired rows first; the same subquery selects the batch for
+# the rollup and the delete inside one transaction.
+_EXPIRED_BATCH = """
+    SELECT id FROM history
+    WHERE timestamp < :cutoff
+    ORDER BY timestamp, id
+    LIMIT :batch
+"""
+
+# Error sums of the rows model_analytics evaluates (numeric actual and
+# p_initial), in its _SUMS order, so rolled-up days stay in the
+# quality metrics. actual is normalized as in model_analytics.
+HISTORY_EVAL_COLUMNS = (
+    "eval_count", "eval_sum_err", "eval_sum_abs_err", "eval_sum_sq_err",
+    "eval_count_adj", "eval_sum_err_adj", "eval_sum_abs_err_adj", "eval_sum_sq_err_adj",
+    "eval_sum_abs_err_paired",
+)
+
+_EVALUATED = "typeof(actual) IN ('integer', 'real') AND typeof(p_initial) IN ('integer', 'real')"
+_ACTUAL_01 = "MIN(MAX(CASE WHEN actual > 1.5 THEN actual / 100.0 ELSE actual END, 0.0), 1.0)"
+_EVAL_MERGE = ",\n    ".join(f"{c} = {c} + excluded.{c}" for c in HISTORY_EVAL_COLUMNS)
+
+# MAX(timestamp) makes the bare alpha..epsilon columns come from the
+# latest row of each group. Rows without a student are deleted
+# without a rollup.
+HISTORY_ROLLUP_SQL = f"""
+INSERT INTO history_daily (
+    student_id, day, count,
+    sum_p_initial, count_p_initial,
+    sum_p_adjusted, count_p_adjusted,
+    sum_error, count_error,
+    last_timestamp, last_alpha, last_beta, last_gamma, last_delta, last_epsilon,
+    {", ".join(HISTORY_EVAL_COLUMNS)}
+)
+SELECT
+    student_id,
+    substr(timestamp, 1, 10),
+    COUNT(*),
+    TOTAL(p_initial), COUNT(p_initial),
+    TOTAL(p_adjusted), COUNT(p_adjusted),
+    TOTAL(error), COUNT(error),
+    MAX(timestamp), alpha, beta, gamma, delta, epsilon,
+    COUNT(eval_err), TOTAL(eval_err), TOTAL(ABS(eval_err)), TOTAL(eval_err * eval_err),
+    COUNT(eval_err_adj), TOTAL(eval_err_adj), TOTAL(ABS(eval_err_adj)), TOTAL(eval_err_adj * eval_err_adj),
+    TOTAL(CASE WHEN eval_err_adj IS NOT NULL THEN ABS(eval_err) END)
+FROM (
+    SELECT
+        *,
+        CASE WHEN {_EVALUATED} THEN p_initial - {_ACTUAL_01} END AS eval_err,
+        CASE WHEN {_EVALUATED} AND p_adjusted IS NOT NULL THEN p_adjusted - {_ACTUAL_01} END AS eval_err_adj
+    FROM history
+    WHERE id IN ({_EXPIRED_BATCH}) AND student_id IS NOT NULL
+)
+GROUP BY student_id, substr(timestamp, 1, 10)
+ON CONFLICT(student_id, day) DO UPDATE SET
+    count = count + excluded.count,
+    sum_p_initial = sum_p_initial + excluded.sum_p_initial,
+    count_p_initial = count_p_initial + excluded.count_p_initial,
+    sum_p_adjusted = sum_p_adjusted + excluded.sum_p_adjusted,
+    count_p_adjusted = count_p_adjusted + excluded.count_p_adjusted,
+    sum_error = sum_error + excluded.sum_error,
+    count_error = count_error + excluded.count_error,
+    last_alpha = CASE WHEN excluded.last_timestamp >= last_timestamp THEN excluded.last_alpha ELSE last_alpha END,
+    last_beta = CASE WHEN excluded.last_timestamp >= last_timestamp THEN excluded.last_beta ELSE last_beta END,
+    last_gamma = CASE WHEN excluded.last_timestamp >= last_timestamp THEN excluded.last_gamma ELSE last_gamma END,
+    last_delta = CASE WHEN excluded.last_timestamp >= last_timestamp THEN excluded.last_delta ELSE last_delta END,
+    last_epsilon = CASE WHEN excluded.last_timestamp >= last_timestamp THEN excluded.last_epsilon ELSE last_epsilon END,
+    last_timestamp = MAX(last_timestamp, excluded.last_timestamp),
+    {_EVAL_MERGE};
+"""
+
+HISTORY_DELETE_EXPIRED_SQL = f"DELETE FROM history WHERE id IN ({_EXPIRED_BATCH});"
+
+# {courses} is one placeholder per default course, {where} an optional
+# "AND s.id = ?" / "AND s.user_id = ?" filter.
+PROVISION_STUDENT_COURSES_SQL = """
+INSERT INTO student_courses (student_id, course_name, enabled, grade, course_id)
+SELECT s.id, c.name, 0, NULL, c.id
+FROM students s
+JOIN courses c ON c.name IN ({courses})
+WHERE NOT EXISTS (
+    SELECT 1 FROM student_courses sc
+    WHERE sc.student_id = s.id AND sc.course_name = c.name
+)
+{where};
+"""
+
+DELETE_STUDENT_COURSE_SQL = "DELETE FROM student_courses WHERE student_id = ? AND course_id = ?;"
+
+UPSERT_STUDENT_COURSE_SQL = """
+INSERT INTO student_courses (student_id, course_name, enabled, grade, course_id)
+SELECT ?, name, ?, ?, id FROM courses WHERE id = ?
+ON CONFLICT(student_id, course_id) DO UPDATE
+SET enabled = excluded.enabled, grade = excluded.grade;
+"""
+
+UPDATE_COURSE_SQL = "UPDATE student_courses SET enabled = ?, grade = ? WHERE id = ?;"
+
+COMPACT_STUDENT_COURSES_SQL = """
+DELETE FROM student_courses
+WHERE COALESCE(enabled, 0) = 0
+AND grade IS NULL
+AND course_id IS NOT NULL;
+"""
+
+# {param} is one of STATS_PARAMETERS, {numeric} its _numeric() filter.
+REFRESH_EXTREMES_SQL = """
+UPDATE param_stats
+SET min = (SELECT MIN({param}) FROM students WHERE {numeric}),
+    max = (SELECT MAX({param}) FROM students WHERE {numeric}),
+    extremes_stale = 0
+WHERE param = '{param}';
+"""
+
+
+def _migrate_initial_schema(cur: sqlite3.Cursor) -> None:
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL
+    );
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS students (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+
+        Ga REAL DEFAULT NULL,
+        Ar REAL DEFAULT NULL,
+        Cp REAL DEFAULT NULL,
+        Ls REAL DEFAULT NULL,
+        Ph REAL DEFAULT NULL,
+
+        Gcurrent REAL DEFAULT NULL,
+        Gmin REAL DEFAULT NULL,
+        Gmax REAL DEFAULT NULL,
+
+        actual REAL DEFAULT NULL,
+        last_prediction REAL DEFAULT NULL,
+
+        FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+    );
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS courses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL,
+        difficulty REAL NOT NULL DEFAULT 2.0
+    );
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS student_courses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER NOT NULL,
+        course_name TEXT NOT NULL,
+        enabled INTEGER DEFAULT 0,
+        grade REAL DEFAULT NULL,
+        course_id INTEGER DEFAULT NULL,
+        FOREIGN KEY(student_id) REFERENCES students(id) ON DELETE CASCADE,
+        FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE SET NULL
+    );
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS course_prerequisites (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        course_id INTEGER NOT NULL,
+        prerequisite_course_id INTEGER NOT NULL,
+        UNIQUE(course_id, prerequisite_course_id),
+        FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE,
+        FOREIGN KEY(prerequisite_course_id) REFERENCES courses(id) ON DELETE CASCADE
+    );
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS trajectory_plan (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER NOT NULL,
+        course_id INTEGER NOT NULL,
+        semester TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'planned',
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(student_id, course_id, semester),
+        FOREIGN KEY(student_id) REFERENCES students(id) ON DELETE CASCADE,
+        FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE
+    );
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER,
+        timestamp TEXT,
+        p_initial REAL,
+        p_adjusted REAL,
+        alpha REAL,
+        beta REAL,
+        gamma REAL,
+        delta REAL,
+        epsilon REAL,
+        actual REAL,
+        error REAL,
+        FOREIGN KEY(student_id) REFERENCES students(id) ON DELETE CASCADE
+    );
+    """)
+
+
+def _migrate_backfill_student_courses(cur: sqlite3.Cursor) -> None:
+    seed_catalog(cur)
+    repair_student_courses(cur)
+    if not SPARSE_STUDENT_COURSES:
+        provision_student_courses(cur)
+
+
+def _migrate_hot_lookup_indexes(cur: sqlite3.Cursor) -> None:
+    # course_prerequisites(course_id) is already covered by the
+    # UNIQUE(course_id, prerequisite_course_id) autoindex.
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_students_user
+    ON students(user_id);
+    """)
+
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_student_courses_student
+    ON student_courses(student_id, course_name);
+    """)
+
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_trajectory_plan_student_semester
+    ON trajectory_plan(student_id, semester);
+    """)
+
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_history_student_timestamp
+    ON history(student_id, timestamp);
+    """)
+
+
+def _migrate_course_link_triggers(cur: sqlite3.Cursor) -> None:
+    # Keeps student_courses.course_id and course_name in step at write
+    # time, so readers never have to repair rows.
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_student_courses_course
+    ON student_courses(course_id);
+    """)
+
+    repair_student_courses(cur)
+
+    link_sql = """
+    BEGIN
+        UPDATE student_courses
+        SET course_id = COALESCE(
+                NULLIF(NEW.course_id, 0),
+                (SELECT id FROM courses WHERE courses.name = NEW.course_name)
+            ),
+            course_name = CASE
+                WHEN NEW.course_name IS NULL OR TRIM(NEW.course_name) = ''
+                THEN COALESCE((SELECT name FROM courses WHERE courses.id = NEW.course_id), NEW.course_name)
+                ELSE NEW.course_name
+            END
+        WHERE id = NEW.id;
+    END;
+    """
+    link_when = """
+    WHEN NEW.course_id IS NULL OR NEW.course_id = 0
+      OR NEW.course_name IS NULL OR TRIM(NEW.course_name) = ''
+    """
+
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_student_courses_link_insert
+    AFTER INSERT ON student_courses
+    {link_when}
+    {link_sql}
+    """)
+
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_student_courses_link_update
+    AFTER UPDATE OF course_id, course_name ON student_courses
+    {link_when}
+    {link_sql}
+    """)
+
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_courses_link_insert
+    AFTER INSERT ON courses
+    BEGIN
+        UPDATE student_courses
+        SET course_id = NEW.id
+        WHERE (course_id IS NULL OR course_id = 0)
+        AND course_name = NEW.name;
+    END;
+    """)
+
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_courses_rename
+    AFTER UPDATE OF name ON courses
+    BEGIN
+        UPDATE student_courses
+        SET course_name = NEW.name
+        WHERE course_id = NEW.id;
+    END;
+    """)
+
+
+def _migrate_unique_student_course(cur: sqlite3.Cursor) -> None:
+    cur.execute("""
+    DELETE FROM student_courses
+    WHERE course_id IS NOT NULL
+    AND id NOT IN (
+        SELECT MIN(id) FROM student_courses
+        WHERE course_id IS NOT NULL
+        GROUP BY student_id, course_id
+    );
+    """)
+
+    cur.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_student_courses_student_course
+    ON student_courses(student_id, course_id);
+    """)
+
+
+def _migrate_catalog_version(cur: sqlite3.Cursor) -> None:
+    # A single counter bumped on any catalog change, so each worker can
+    # revalidate its cached catalog with one primary-key lookup.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS catalog_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    );
+    """)
+    cur.execute("INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 1);")
+
+    for table in ("courses", "course_prerequisites"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_catalog_version
+            AFTER {event} ON {table}
+            BEGIN
+                UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+            END;
+            """)
+
+
+def _migrate_student_data_version(cur: sqlite3.Cursor) -> None:
+    # Per-student counter bumped on any change that can affect a
+    # prediction or plan; caches key on it instead of comparing data.
+    cur.execute("ALTER TABLE students ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0;")
+
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_students_data_version
+    AFTER UPDATE OF name, Gcurrent, Gmin, Gmax, Ar, Ls, Ph, actual ON students
+    BEGIN
+        UPDATE students SET data_version = data_version + 1 WHERE id = NEW.id;
+    END;
+    """)
+
+    for table in ("student_courses", "trajectory_plan"):
+        for event, ref in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_data_version
+            AFTER {event} ON {table}
+            BEGIN
+                UPDATE students SET data_version = data_version + 1 WHERE id = {ref}.student_id;
+            END;
+            """)
+
+
+def _numeric(ref: str) -> str:
+    return f"typeof({ref}) IN ('integer', 'real')"
+
+
+def _stats_add_sql(param: str, x: str) -> str:
+    # Welford update; every SET expression sees the pre-update row.
+    return f"""
+        UPDATE param_stats SET
+            count = count + 1,
+            mean = mean + ({x} - mean) / (count + 1),
+            m2 = m2 + ({x} - mean) * ({x} - (mean + ({x} - mean) / (count + 1))),
+            min = CASE WHEN min IS NULL OR {x} < min THEN {x} ELSE min END,
+            max = CASE WHEN max IS NULL OR {x} > max THEN {x} ELSE max END
+        WHERE param = '{param}' AND {_numeric(x)};
+    """
+
+
+def _stats_remove_sql(param: str, x: str) -> str:
+    # Inverse Welford update. Removing a current extreme only marks
+    # min/max stale; they are recomputed lazily on the next read.
+    return f"""
+        UPDATE param_stats SET
+            count = count - 1,
+            mean = CASE WHEN count <= 1 THEN 0 ELSE (mean * count - {x}) / (count - 1) END,
+            m2 = CASE WHEN count <= 1 THEN 0
+                 ELSE MAX(m2 - ({x} - mean) * ({x} - (mean * count - {x}) / (count - 1)), 0) END,
+            min = CASE WHEN count <= 1 THEN NULL ELSE min END,
+            max = CASE WHEN count <= 1 THEN NULL ELSE max END,
+            extremes_stale = CASE
+                WHEN count <= 1 THEN 0
+                WHEN {x} <= min OR {x} >= max THEN 1
+                ELSE extremes_stale
+            END
+        WHERE param = '{param}' AND {_numeric(x)};
+    """
+
+
+def _migrate_running_stats(cur: sqlite3.Cursor) -> None:
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS param_stats (
+        param TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0,
+        mean REAL NOT NULL DEFAULT 0,
+        m2 REAL NOT NULL DEFAULT 0,
+        min REAL DEFAULT NULL,
+        max REAL DEFAULT NULL,
+        extremes_stale INTEGER NOT NULL DEFAULT 0
+    );
+    """)
+
+    rebuild_param_stats(cur)
+
+    for p in STATS_PARAMETERS:
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_students_insert_stats_{p}
+        AFTER INSERT ON students
+        WHEN {_numeric(f"NEW.{p}")}
+        BEGIN
+            {_stats_add_sql(p, f"NEW.{p}")}
+        END;
+        """)
+
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_students_delete_stats_{p}
+        AFTER DELETE ON students
+        WHEN {_numeric(f"OLD.{p}")}
+        BEGIN
+            {_stats_remove_sql(p, f"OLD.{p}")}
+        END;
+        """)
+
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_students_update_stats_{p}
+        AFTER UPDATE OF {p} ON students
+        WHEN OLD.{p} IS NOT NEW.{p}
+        BEGIN
+            {_stats_remove_sql(p, f"OLD.{p}")}
+            {_stats_add_sql(p, f"NEW.{p}")}
+        END;
+        """)
+
+
+def _migrate_history_rollups(cur: sqlite3.Cursor) -> None:
+    # Per-student daily aggregates of history rows older than the
+    # retention window (see HistoryManager.compact). Means are stored
+    # as sums and counts so batches can be merged; last_* hold the
+    # weights of the latest rolled-up prediction of the day.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS history_daily (
+        student_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        sum_p_initial REAL NOT NULL DEFAULT 0,
+        count_p_initial INTEGER NOT NULL DEFAULT 0,
+        sum_p_adjusted REAL NOT NULL DEFAULT 0,
+        count_p_adjusted INTEGER NOT NULL DEFAULT 0,
+        sum_error REAL NOT NULL DEFAULT 0,
+        count_error INTEGER NOT NULL DEFAULT 0,
+        last_timestamp TEXT,
+        last_alpha REAL,
+        last_beta REAL,
+        last_gamma REAL,
+        last_delta REAL,
+        last_epsilon REAL,
+        PRIMARY KEY (student_id, day),
+        FOREIGN KEY(student_id) REFERENCES students(id) ON DELETE CASCADE
+    );
+    """)
+
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_history_timestamp
+    ON history(timestamp);
+    """)
+
+
+def _migrate_history_rollup_eval(cur: sqlite3.Cursor) -> None:
+    # Error sums for model_analytics (see HISTORY_EVAL_COLUMNS). Days
+    # rolled up before this migration keep zeros and are not evaluated.
+    for column in HISTORY_EVAL_COLUMNS:
+        kind = "INTEGER" if column.startswith("eval_count") else "REAL"
+        cur.execute(f"ALTER TABLE history_daily ADD COLUMN {column} {kind} NOT NULL DEFAULT 0;")
+
+
+def _migrate_model_weights(cur: sqlite3.Cursor) -> None:
+    # Versioned prediction weights (see model_store.py). At most one
+    # row is active; with none, prediction_engine uses its built-in
+    # WEIGHTS and K.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS model_weights (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        alpha REAL NOT NULL,
+        beta REAL NOT NULL,
+        gamma REAL NOT NULL,
+        delta REAL NOT NULL,
+        epsilon REAL NOT NULL,
+        k REAL NOT NULL,
+        source TEXT NOT NULL DEFAULT 'manual',
+        samples INTEGER NOT NULL DEFAULT 0,
+        mae REAL DEFAULT NULL,
+        rmse REAL DEFAULT NULL,
+        active INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+
+    cur.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_model_weights_active
+    ON model_weights(active) WHERE active = 1;
+    """)
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, "initial schema", _migrate_initial_schema),
+    (2, "backfill student course rows", _migrate_backfill_student_courses),
+    (3, "hot lookup indexes", _migrate_hot_lookup_indexes),
+    (4, "course link triggers", _migrate_course_link_triggers),
+    (5, "unique student course", _migrate_unique_student_course),
+    (6, "catalog version", _migrate_catalog_version),
+    (7, "student data version", _migrate_student_data_version),
+    (8, "running parameter stats", _migrate_running_stats),
+    (9, "history rollups", _migrate_history_rollups),
+    (10, "model weights", _migrate_model_weights),
+    (11, "history rollup evaluation sums", _migrate_history_rollup_eval),
+]
+
+
+def seed_catalog(cur: sqlite3.Cursor) -> int:
+    """
+    Inserts missing DEFAULT_COURSES into the catalog. Returns the number added.
+    """
+    cur.executemany(
+        "INSERT OR IGNORE INTO courses (name, difficulty) VALUES (?, 2.0);",
+        [(name,) for name in DEFAULT_COURSES],
+    )
+    return cur.rowcount
+
+
+def repair_student_courses(cur: sqlite3.Cursor) -> None:
+    """
+    Fills in course_name from course_id and course_id from course_name
+    wherever one of the pair is missing.
+    """
+    cur.execute("""
+    UPDATE student_courses
+    SET course_name = (SELECT name FROM courses WHERE courses.id = student_courses.course_id)
+    WHERE (course_name IS NULL OR TRIM(course_name) = '')
+    AND course_id IS NOT NULL;
+    """)
+
+    cur.execute("""
+    UPDATE student_courses
+    SET course_id = (SELECT id FROM courses WHERE courses.name = student_courses.course_name)
+    WHERE (course_id IS NULL OR course_id = 0)
+    AND course_name IN (SELECT name FROM courses);
+    """)
+
+
+def provision_student_courses(
+    cur: sqlite3.Cursor,
+    student_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+) -> int:
+    """
+    Creates the missing default student_courses rows with one INSERT ... SELECT
+    against the catalog, for one student, one user's students, or everyone.
+    Returns the number of rows inserted.
+    """
+    placeholders = ", ".join("?" for _ in DEFAULT_COURSES)
+    params: List[Any] = list(DEFAULT_COURSES)
+
+    where = ""
+    if student_id is not None:
+        where = "AND s.id = ?"
+        params.append(student_id)
+    elif user_id is not None:
+        where = "AND s.user_id = ?"
+        params.append(user_id)
+
+    cur.execute(PROVISION_STUDENT_COURSES_SQL.format(courses=placeholders, where=where), params)
+    return cur.rowcount
+
+
+def set_student_courses(
+    cur: sqlite3.Cursor,
+    student_id: int,
+    changes: Iterable[Tuple[int, int, Optional[float]]],
+) -> None:
+    """
+    Stores a student's (course_id, enabled, grade) states with one executemany
+    per statement. In sparse mode a course that is neither enabled nor graded
+    has its row removed.
+    """
+    deletes: List[Tuple[int, int]] = []
+    upserts: List[Tuple[int, int, Optional[float], int]] = []
+    for course_id, enabled, grade in changes:
+        if SPARSE_STUDENT_COURSES and not enabled and grade is None:
+            deletes.append((student_id, course_id))
+        else:
+            upserts.append((student_id, enabled, grade, course_id))
+
+    if deletes:
+        cur.executemany(DELETE_STUDENT_COURSE_SQL, deletes)
+
+    if upserts:
+        cur.executemany(UPSERT_STUDENT_COURSE_SQL, upserts)
+
+
+def set_student_course(
+    cur: sqlite3.Cursor,
+    student_id: int,
+    course_id: int,
+    enabled: int,
+    grade: Optional[float],
+) -> None:
+    set_student_courses(cur, student_id, [(course_id, enabled, grade)])
+
+
+def compact_student_courses(cur: sqlite3.Cursor) -> int:
+    """
+    Deletes catalog rows that are neither enabled nor graded. Returns the count.
+    """
+    cur.execute(COMPACT_STUDENT_COURSES_SQL)
+    return cur.rowcount
+
+
+def rebuild_param_stats(cur: sqlite3.Cursor) -> None:
+    """
+    Recomputes param_stats exactly from the students table (two passes).
+    """
+    for p in STATS_PARAMETERS:
+        cur.execute(f"""
+        INSERT OR REPLACE INTO param_stats (param, count, mean, m2, min, max, extremes_stale)
+        SELECT '{p}', COUNT({p}), COALESCE(AVG({p}), 0), 0, MIN({p}), MAX({p}), 0
+        FROM students
+        WHERE {_numeric(p)};
+        """)
+
+        cur.execute(f"""
+        UPDATE param_stats
+        SET m2 = (
+            SELECT TOTAL((s.{p} - param_stats.mean) * (s.{p} - param_stats.mean))
+            FROM students s
+            WHERE {_numeric(f"s.{p}")}
+        )
+        WHERE param = '{p}';
+        """)
+
+
+def refresh_stale_extremes(cur: sqlite3.Cursor, param: str) -> None:
+    """
+    Recomputes min/max for one parameter after an extreme value was removed.
+    """
+    if param not in STATS_PARAMETERS:
+        raise ValueError(f"Unknown stats parameter: {param}")
+    cur.execute(REFRESH_EXTREMES_SQL.format(param=param, numeric=_numeric(param)))
+
+
+def schema_version(cur: sqlite3.Cursor) -> int:
+    row = cur.execute("SELECT MAX(version) FROM schema_version;").fetchone()
+    return int(row[0] or 0)
+
+
+def migrate(conn: sqlite3.Connection) -> List[int]:
+    """
+    Applies pending migrations in order, then seeds the catalog.
+    Runs in one IMMEDIATE transaction so concurrent workers serialize.
+    Returns the versions that were applied.
+    """
+    applied: List[int] = []
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE;")
+    try:
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+        """)
+
+        current = schema_version(cur)
+        for version, name, step in MIGRATIONS:
+            if version <= current:
+                continue
+            step(cur)
+            cur.execute(
+                "INSERT INTO schema_version (version, name) VALUES (?, ?);",
+                (version, name),
+            )
+            applied.append(version)
+
+        if seed_catalog(cur) > 0 and not SPARSE_STUDENT_COURSES:
+            provision_student_courses(cur)
+
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    return applied
+
+
+_ready_paths: Set[str] = set()
+_ready_lock = threading.Lock()
+
+
+def ensure_schema(path: str = DB_PATH) -> None:
+    """
+    Migrates a database file once per process; later calls are no-ops.
+    """
+    key = os.path.abspath(path)
+    with _ready_lock:
+        if key in _ready_paths:
+            return
+        with get_pool(key).connection() as conn:
+            migrate(conn)
+        _ready_paths.add(key)
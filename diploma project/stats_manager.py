@@ -1,75 +1,239 @@
-import sqlite3
 import os
+import tempfile
+import time
 import numpy as np
 
+from connection_pool import get_pool
+from schema import STATS_PARAMETERS, ensure_schema, rebuild_param_stats, refresh_stale_extremes
+
 # ------------------------------------------------------------
 # Stats Manager Module
 # ------------------------------------------------------------
 # This module calculates and stores parameter statistics used for
 # normalization in the prediction model.
 # Stats include: min, max, mean, std for each parameter.
+# Running count/mean/M2/min/max live in the param_stats table and
+# are maintained incrementally by triggers (see schema.py).
+# Saved stats use a fixed binary layout that is read with np.memmap:
+#   header:  magic "PSTA", uint32 format version, uint64 generation
+#   records: one RECORD_DTYPE row per parameter, in PARAMETERS order
+# The file is written by `manage.py rebuild-stats` and read by the
+# app's /metrics endpoint through load_stats.
 # ------------------------------------------------------------
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "system.db")
 
-PARAMETERS = ["Ga", "Ar", "Cp", "Ls", "Ph"]
+PARAMETERS = list(STATS_PARAMETERS)
 
+DEFAULT_STATS = {"min": 0, "max": 1, "mean": 0.5, "std": 0.1, "count": 0}
 
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
+PARAM_STATS_SQL = "SELECT * FROM param_stats"
+
+STATS_PATH = os.path.join(BASE_DIR, "stats.bin")
+STATS_MAGIC = b"PSTA"
+STATS_FORMAT_VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("format", "<u4"),
+    ("generation", "<u8"),
+])
+
+RECORD_DTYPE = np.dtype([
+    ("param", "S8"),
+    ("min", "<f8"),
+    ("max", "<f8"),
+    ("mean", "<f8"),
+    ("std", "<f8"),
+    ("count", "<i8"),
+])
+
+# path -> (generation, stats) of the last records read by load_stats
+_loaded = {}
+
+
+def stats_path_for(db_path=None):
+    """
+    Stats file for a database: stats.bin for system.db, otherwise
+    <database name>.stats.bin next to it.
+    """
+    if db_path is None or os.path.abspath(db_path) == os.path.abspath(DB_PATH):
+        return STATS_PATH
+    return os.path.splitext(os.path.abspath(db_path))[0] + ".stats.bin"
 
 
-def compute_stats():
-    db = get_db()
-    rows = db.execute("SELECT Ga, Ar, Cp, Ls, Ph FROM students").fetchall()
-    db.close()
+def get_db():
+    """
+    Borrows a pooled connection; use as `with get_db() as db:`.
+    """
+    return get_pool(DB_PATH).connection()
+
+
+def compute_stats(path=None):
+    """
+    Reads the running statistics kept in param_stats by triggers on
+    students: O(1) per parameter instead of a scan of every student.
+    min/max are recomputed only if an extreme value was removed.
+    """
+    if path is None:
+        path = DB_PATH
 
-    if len(rows) == 0:
-        return {key: {"min": 0, "max": 1, "mean": 0.5, "std": 0.1} for key in PARAMETERS}
+    ensure_schema(path)
+    with get_pool(path).transaction() as db:
+        cur = db.cursor()
+        rows = {r["param"]: r for r in cur.execute(PARAM_STATS_SQL).fetchall()}
+
+        stale = [p for p in PARAMETERS if p in rows and rows[p]["extremes_stale"]]
+        for param in stale:
+            refresh_stale_extremes(cur, param)
+        if stale:
+            rows = {r["param"]: r for r in cur.execute(PARAM_STATS_SQL).fetchall()}
 
     stats = {}
 
     for param in PARAMETERS:
-        values = []
-        for row in rows:
-            raw = row[param]
-            try:
-                values.append(float(raw))
-            except Exception:
-                continue
-
-        if len(values) == 0:
-            stats[param] = {"min": 0, "max": 1, "mean": 0.5, "std": 0.1}
+        row = rows.get(param)
+        if row is None or row["count"] == 0:
+            stats[param] = dict(DEFAULT_STATS)
             continue
 
-        arr = np.array(values, dtype=float)
-        s = float(arr.std())
+        s = float(np.sqrt(max(row["m2"], 0.0) / row["count"]))
         stats[param] = {
-            "min": float(arr.min()),
-            "max": float(arr.max()),
-            "mean": float(arr.mean()),
+            "min": float(row["min"]),
+            "max": float(row["max"]),
+            "mean": float(row["mean"]),
             "std": float(s if s > 0 else 0.1),
+            "count": int(row["count"]),
         }
 
     return stats
 
 
+def rebuild_stats(path=None):
+    """
+    Recomputes the running statistics exactly from all students.
+    """
+    if path is None:
+        path = DB_PATH
+
+    ensure_schema(path)
+    with get_pool(path).transaction() as db:
+        rebuild_param_stats(db.cursor())
+
+
+def _to_records(stats):
+    records = np.zeros(len(PARAMETERS), dtype=RECORD_DTYPE)
+    for i, param in enumerate(PARAMETERS):
+        values = stats.get(param, DEFAULT_STATS)
+        records[i] = (
+            param.encode("ascii"),
+            values["min"],
+            values["max"],
+            values["mean"],
+            values["std"],
+            values.get("count", 0),
+        )
+    return records
+
+
+def _from_records(records):
+    stats = {}
+    for rec in records:
+        stats[rec["param"].decode("ascii")] = {
+            "min": float(rec["min"]),
+            "max": float(rec["max"]),
+            "mean": float(rec["mean"]),
+            "std": float(rec["std"]),
+            "count": int(rec["count"]),
+        }
+    for param in PARAMETERS:
+        stats.setdefault(param, dict(DEFAULT_STATS))
+    return stats
+
+
+def read_generation(path=None):
+    """
+    Reads only the 16-byte header. Returns None if the file is missing
+    or not in the current format.
+    """
+    if path is None:
+        path = STATS_PATH
+
+    try:
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    except (OSError, ValueError):
+        return None
+
+    if header.shape[0] != 1 or header[0]["magic"] != STATS_MAGIC or header[0]["format"] != STATS_FORMAT_VERSION:
+        return None
+    return int(header[0]["generation"])
+
+
+def _read_records(path):
+    mm = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_DTYPE.itemsize)
+    records = np.array(mm)
+    # Release the mapping right away so the file can be replaced
+    # (os.replace fails on Windows while a mapping is open).
+    del mm
+    return records
+
+
 def save_stats(stats, path=None):
+    """
+    Writes stats atomically (temp file + rename), but only if the values
+    differ from what is on disk. Returns True if the file was written.
+    """
     if path is None:
-        path = os.path.join(BASE_DIR, "stats.npy")
-    np.save(path, stats, allow_pickle=True)
+        path = STATS_PATH
+
+    records = _to_records(stats)
+
+    generation = read_generation(path)
+    if generation is not None:
+        try:
+            current = _read_records(path)
+        except (OSError, ValueError):
+            current = None
+        if current is not None and current.shape == records.shape and bool(np.all(current == records)):
+            return False
+
+    # Wall-clock nanoseconds keep generations distinct even when two
+    # workers replace the file from the same previous generation.
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header[0] = (STATS_MAGIC, STATS_FORMAT_VERSION, max((generation or 0) + 1, time.time_ns()))
+
+    fd, tmp_path = tempfile.mkstemp(prefix=".stats-", suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header.tobytes())
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return True
 
 
 def load_stats(path=None):
+    """
+    Returns the stored stats. The header generation is checked on every
+    call and the records are only re-read when it changed.
+    """
     if path is None:
-        path = os.path.join(BASE_DIR, "stats.npy")
+        path = STATS_PATH
 
-    if not os.path.exists(path):
-        return {key: {"min": 0, "max": 1, "mean": 0.5, "std": 0.1} for key in PARAMETERS}
+    generation = read_generation(path)
+    if generation is None:
+        return {key: dict(DEFAULT_STATS) for key in PARAMETERS}
 
-    stats = np.load(path, allow_pickle=True).item()
-    return stats
+    cached = _loaded.get(path)
+    if cached is None or cached[0] != generation:
+        cached = (generation, _from_records(_read_records(path)))
+        _loaded[path] = cached
+
+    return {key: dict(values) for key, values in cached[1].items()}
@@ -1,16 +1,37 @@
+from course_catalog import catalog
+from prerequisite_graph import PrerequisiteGraph
+
 PASS_GRADE = 60.0
 
-def recommend_courses(student, courses_taken, all_courses, prerequisites_map, p_adjusted=None):
-    taken_ids = {x["course_id"] for x in courses_taken if x.get("course_id") is not None}
+def recommend_courses(student, courses_taken, all_courses=None, prerequisites_map=None, p_adjusted=None):
+    if all_courses is None or prerequisites_map is None:
+        snapshot = catalog.get()
+        if all_courses is None:
+            all_courses = snapshot.courses
+        if prerequisites_map is None:
+            graph = snapshot.graph
+        else:
+            graph = PrerequisiteGraph(snapshot.by_id.keys(), prerequisites_map)
+    else:
+        graph = PrerequisiteGraph((int(c["id"]) for c in all_courses), prerequisites_map)
+
+    # get_student_courses lists the whole catalog; only enabled or
+    # graded rows are courses the student has actually taken.
+    taken_ids = {
+        x["course_id"]
+        for x in courses_taken
+        if x.get("course_id") is not None and (x.get("enabled") or x.get("grade") is not None)
+    }
     passed_ids = {
         x["course_id"]
         for x in courses_taken
         if x.get("course_id") is not None and x.get("grade") is not None and float(x["grade"]) >= PASS_GRADE
     }
 
+    passed_mask = graph.mask(passed_ids)
+
     def prereqs_satisfied(course_id: int) -> bool:
-        reqs = prerequisites_map.get(course_id, set())
-        return reqs.issubset(passed_ids)
+        return graph.satisfied(course_id, passed_mask)
 
     risk_level = "Низький"
     if p_adjusted is not None:
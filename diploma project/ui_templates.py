@@ -91,11 +91,13 @@ STUDENTS_PAGE = """
         <table>
             <tr>
                 <th>Name</th>
+                <th>Last prediction</th>
                 <th>Actions</th>
             </tr>
             {% for s in students %}
             <tr>
                 <td>{{ s.name }}</td>
+                <td>{{ "%.1f"|format(s.last_prediction * 100.0) if s.last_prediction is not none else "—" }}</td>
                 <td>
                     <a href="/edit/{{ s.id }}">Edit</a> |
                     <a href="/predict/{{ s.id }}">Predict</a> |
@@ -105,7 +107,7 @@ STUDENTS_PAGE = """
             {% endfor %}
         </table>
 
-        <p><a href="/logout">Logout</a></p>
+        <p><a href="/analytics">Model analytics</a> | <a href="/logout">Logout</a></p>
     </div>
 </body>
 </html>
@@ -217,11 +219,11 @@ EDIT_PAGE = """
 
             {% for c in courses %}
             <div class="course-row">
-                <input type="checkbox" name="course_{{c.id}}_enabled"
+                <input type="checkbox" name="course_{{c.course_id}}_enabled"
                        {% if c.enabled %}checked{% endif %}>
                 <label>{{ c.name }}</label>
                 <input type="number" min="0" max="100" step="1"
-                       name="course_{{c.id}}_grade"
+                       name="course_{{c.course_id}}_grade"
                        value="{{ c.grade if c.grade != None else '' }}">
             </div>
             {% endfor %}
@@ -294,3 +296,82 @@ PREDICTION_PAGE = """
 </body>
 </html>
 """
+
+# ---------------------- MODEL ANALYTICS PAGE ----------------------
+ANALYTICS_PAGE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Model analytics</title>
+    <style>
+        body { font-family: Arial; background: #e5e5e5; }
+        .container {
+            width: 900px; margin: auto; background: #fff;
+            margin-top: 40px; padding: 20px;
+            border-radius: 10px; box-shadow: 0 0 10px #aaa;
+        }
+        table { width: 100%; border-collapse: collapse; margin-top: 10px; margin-bottom: 20px; }
+        th, td { padding: 6px; border-bottom: 1px solid #ccc; text-align: right; }
+        th:first-child, td:first-child { text-align: left; }
+        a { text-decoration: none; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h2>Model analytics</h2>
+
+        <form method="GET">
+            Window:
+            <select name="window" onchange="this.form.submit()">
+                {% for w in windows %}
+                <option value="{{ w }}" {% if w == report.window %}selected{% endif %}>{{ w }}</option>
+                {% endfor %}
+            </select>
+        </form>
+
+        {% macro fmt(v) %}{{ "%.4f"|format(v) if v is not none else "—" }}{% endmacro %}
+
+        {% for title, rows in [("Overall", [report.overall]), ("By cohort", report.by_cohort), ("By " ~ report.window, report.by_window)] %}
+        <h3>{{ title }}</h3>
+        <table>
+            <tr>
+                <th>Group</th><th>n</th><th>MAE</th><th>RMSE</th><th>Bias</th>
+                <th>n adjusted</th><th>MAE adjusted</th><th>RMSE adjusted</th><th>Improvement</th>
+            </tr>
+            {% for r in rows %}
+            <tr>
+                <td>{{ r.key }}</td>
+                <td>{{ r.n }}</td>
+                <td>{{ fmt(r.mae) }}</td>
+                <td>{{ fmt(r.rmse) }}</td>
+                <td>{{ fmt(r.bias) }}</td>
+                <td>{{ r.n_adjusted }}</td>
+                <td>{{ fmt(r.mae_adjusted) }}</td>
+                <td>{{ fmt(r.rmse_adjusted) }}</td>
+                <td>{{ fmt(r.improvement) }}</td>
+            </tr>
+            {% endfor %}
+        </table>
+        {% endfor %}
+
+        {% for name in ["initial", "adjusted"] %}
+        <h3>Calibration ({{ name }})</h3>
+        <table>
+            <tr><th>Bin</th><th>n</th><th>Mean predicted</th><th>Observed</th></tr>
+            {% for r in report.calibration[name] %}
+            <tr>
+                <td>{{ r.bin }}</td>
+                <td>{{ r.n }}</td>
+                <td>{{ fmt(r.mean_predicted) }}</td>
+                <td>{{ fmt(r.observed) }}</td>
+            </tr>
+            {% endfor %}
+        </table>
+        {% endfor %}
+
+        <p>Computed in {{ "%.2f"|format(report.elapsed_s) }}s.</p>
+        <p><a href="/students">Back</a></p>
+    </div>
+</body>
+</html>
+"""
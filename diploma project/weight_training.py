@@ -0,0 +1,167 @@
+import itertools
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from connection_pool import get_pool
+from model_store import ModelStore, activate, save_weights
+from prediction_engine import WEIGHT_KEYS, active_model, batch_features
+from prediction_refresh import load_cohort
+from schema import ensure_schema
+
+# ------------------------------------------------------------
+# Weight Training
+# ------------------------------------------------------------
+# Fits alpha..epsilon to observed outcomes by least squares over the
+# whole cohort, constrained to the probability simplex (every weight
+# >= 0, weights sum to 1), so P_initial stays a convex combination of
+# the [0, 1] features and needs no clipping.
+#
+# Features are the same as predict_batch computes; the target is the
+# student's actual outcome, or the latest outcome logged in history
+# when the student record no longer has one. Only X^T X and X^T y are
+# accumulated (chunk by chunk), so the solve itself is 5x5.
+# ------------------------------------------------------------
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "system.db")
+
+CHUNK_SIZE = 100_000
+MIN_SAMPLES = 10
+
+LATEST_HISTORY_ACTUAL_SQL = """
+SELECT h.student_id, h.actual
+FROM history h
+WHERE h.id IN (
+    SELECT MAX(id) FROM history
+    WHERE typeof(actual) IN ('integer', 'real')
+    GROUP BY student_id
+);
+"""
+
+
+def load_training_set(conn) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns (X, y): X is (N, 5) in WEIGHT_KEYS order, y the outcome in [0, 1].
+    """
+    ids, columns = load_cohort(conn)
+
+    # Fill outcomes missing on the student from the prediction history.
+    actual = columns["actual"]
+    cur = conn.cursor()
+    cur.row_factory = None
+    logged = cur.execute(LATEST_HISTORY_ACTUAL_SQL).fetchall()
+    if logged and ids.shape[0]:
+        arr = np.array(logged, dtype=np.float64)
+        logged_ids = arr[:, 0].astype(np.int64)
+        pos = np.clip(np.searchsorted(ids, logged_ids), 0, ids.shape[0] - 1)
+        known = (ids[pos] == logged_ids) & np.isnan(actual[pos])
+        actual[pos[known]] = arr[known, 1]
+
+    Ga, Ar, Cp, Ls, Ph, actual_n, has_actual = batch_features(columns)
+    X = np.column_stack((Ga, Ar, Cp, Ls, Ph))[has_actual]
+    return X, actual_n[has_actual]
+
+
+def normal_equations(X: np.ndarray, y: np.ndarray, chunk_size: int = CHUNK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Accumulates X^T X and X^T y chunk by chunk.
+    """
+    G = np.zeros((X.shape[1], X.shape[1]), dtype=np.float64)
+    b = np.zeros(X.shape[1], dtype=np.float64)
+    for start in range(0, X.shape[0], chunk_size):
+        Xc = X[start:start + chunk_size]
+        G += Xc.T @ Xc
+        b += Xc.T @ y[start:start + chunk_size]
+    return G, b
+
+
+def fit_simplex_least_squares(G: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Minimizes w^T G w - 2 b^T w subject to w >= 0 and sum(w) = 1.
+
+    With five weights the optimum can be found exactly: for every
+    support set, solve the equality-constrained problem (KKT system)
+    and keep the best feasible solution.
+    """
+    n = G.shape[0]
+    best_w = np.full(n, 1.0 / n)
+    best_obj = best_w @ G @ best_w - 2 * b @ best_w
+
+    for size in range(1, n + 1):
+        for support in itertools.combinations(range(n), size):
+            idx = list(support)
+            kkt = np.zeros((size + 1, size + 1))
+            kkt[:size, :size] = G[np.ix_(idx, idx)]
+            kkt[:size, size] = 1.0
+            kkt[size, :size] = 1.0
+            rhs = np.concatenate((b[idx], [1.0]))
+
+            sol = np.linalg.lstsq(kkt, rhs, rcond=None)[0]
+            w_s = sol[:size]
+            if np.any(w_s < -1e-12) or abs(w_s.sum() - 1.0) > 1e-9:
+                continue
+
+            w = np.zeros(n)
+            w[idx] = np.clip(w_s, 0.0, None)
+            w /= w.sum()
+            obj = w @ G @ w - 2 * b @ w
+            if obj < best_obj - 1e-15:
+                best_obj, best_w = obj, w
+
+    return best_w
+
+
+def train_weights(
+    path: str = DB_PATH,
+    activate_version: bool = True,
+    k: Optional[float] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """
+    Fits the weights on the current cohort, stores them as a new version
+    and (by default) activates it. K is kept from the active model unless given.
+    """
+    ensure_schema(path)
+    ModelStore(path).sync()
+    pool = get_pool(path)
+    started = time.perf_counter()
+
+    with pool.connection() as conn:
+        X, y = load_training_set(conn)
+
+    if X.shape[0] < MIN_SAMPLES:
+        raise ValueError(f"Need at least {MIN_SAMPLES} students with an outcome, found {X.shape[0]}")
+
+    G, b = normal_equations(X, y, chunk_size=chunk_size)
+    w = fit_simplex_least_squares(G, b)
+    weights = {key: float(v) for key, v in zip(WEIGHT_KEYS, w)}
+
+    current_weights, current_k, current_version = active_model()
+    if k is None:
+        k = current_k
+
+    residual = X @ w - y
+    current = X @ np.array([current_weights[key] for key in WEIGHT_KEYS]) - y
+    mae = float(np.mean(np.abs(residual)))
+    rmse = float(np.sqrt(np.mean(residual * residual)))
+
+    with pool.transaction() as conn:
+        version = save_weights(conn, weights, k, source="least_squares", samples=X.shape[0], mae=mae, rmse=rmse)
+        if activate_version:
+            activate(conn, version)
+
+    return {
+        "version": version,
+        "active": activate_version,
+        "weights": weights,
+        "k": float(k),
+        "samples": int(X.shape[0]),
+        "mae": mae,
+        "rmse": rmse,
+        "previous_version": current_version,
+        "previous_mae": float(np.mean(np.abs(current))),
+        "elapsed_s": time.perf_counter() - started,
+    }
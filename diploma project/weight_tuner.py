@@ -0,0 +1,186 @@
+import itertools
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from connection_pool import get_pool
+from model_store import ModelStore, activate, save_weights
+from prediction_engine import K, WEIGHT_KEYS
+from schema import ensure_schema
+from weight_training import load_training_set
+
+# ------------------------------------------------------------
+# Weight Grid Search
+# ------------------------------------------------------------
+# Scores many (weights, K) candidates against every student with a
+# known outcome at once: features (N x 5) @ candidate weights (5 x M)
+# gives all initial predictions in one matrix product, and the K
+# correction of predict() is applied with broadcasting on the same
+# (N x M) block for each K value. Rows are processed in chunks so a
+# block never holds more than MAX_BLOCK values.
+# ------------------------------------------------------------
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "system.db")
+
+GRID_STEP = 0.1
+K_VALUES = (0.0, 0.5, K, 1.5)
+CALIBRATION_BINS = 10
+MAX_BLOCK = 4_000_000
+
+
+def simplex_grid(step: float = GRID_STEP, dims: int = len(WEIGHT_KEYS)) -> np.ndarray:
+    """
+    All weight vectors with non-negative multiples of step summing to 1,
+    as a (dims, M) array.
+    """
+    parts = int(round(1.0 / step))
+    if parts <= 0 or abs(parts * step - 1.0) > 1e-9:
+        raise ValueError(f"step must divide 1, got {step}")
+
+    # Stars and bars: choosing dims - 1 bar positions among parts + dims - 1 slots.
+    bars = np.array(list(itertools.combinations(range(parts + dims - 1), dims - 1)), dtype=np.int64)
+    edges = np.hstack((np.full((bars.shape[0], 1), -1), bars, np.full((bars.shape[0], 1), parts + dims - 1)))
+    counts = np.diff(edges, axis=1) - 1
+    return (counts / parts).T
+
+
+def evaluate(
+    X: np.ndarray,
+    y: np.ndarray,
+    W: np.ndarray,
+    k_values: Sequence[float] = K_VALUES,
+    bins: int = CALIBRATION_BINS,
+    max_block: int = MAX_BLOCK,
+) -> Dict[str, np.ndarray]:
+    """
+    Metrics for M weight vectors W (5, M). Initial-prediction metrics
+    are arrays of length M; mae_adjusted is (M, len(k_values)).
+    """
+    k_values = np.asarray(k_values, dtype=np.float64)
+    n, m = X.shape[0], W.shape[1]
+    rows = max(1, max_block // max(m, 1))
+
+    abs_sum = np.zeros(m)
+    sq_sum = np.zeros(m)
+    err_sum = np.zeros(m)
+    abs_adj_sum = np.zeros((m, k_values.shape[0]))
+    bin_p = np.zeros(m * bins)
+    bin_y = np.zeros(m * bins)
+    offsets = (np.arange(m) * bins)[None, :]
+    weight_sum = W.sum(axis=0)[None, :]
+
+    for start in range(0, n, rows):
+        Xc = X[start:start + rows]
+        yc = y[start:start + rows, None]
+
+        raw = Xc @ W
+        P = np.clip(raw, 0.0, 1.0)
+        err = P - yc
+        abs_sum += np.abs(err).sum(axis=0)
+        sq_sum += (err * err).sum(axis=0)
+        err_sum += err.sum(axis=0)
+
+        b = (np.clip((P * bins).astype(np.int64), 0, bins - 1) + offsets).ravel()
+        bin_p += np.bincount(b, weights=P.ravel(), minlength=m * bins)
+        bin_y += np.bincount(b, weights=np.broadcast_to(yc, P.shape).ravel(), minlength=m * bins)
+        del b
+
+        # K correction as in predict(): alpha and beta are scaled by
+        # (1 + K * e|e| * Ga) and (1 + K * e|e| * Ar), then all weights
+        # are renormalized. Expanded, with s = K * e|e|:
+        #   P_adj = (raw + s * (alpha Ga^2 + beta Ar^2)) / (sum(w) + s * (alpha Ga + beta Ar))
+        g = -err * np.abs(err)
+        U = Xc[:, :2] @ W[:2]
+        V = (Xc[:, :2] * Xc[:, :2]) @ W[:2]
+        for j, k in enumerate(k_values.tolist()):
+            s = g * k
+            total = weight_sum + s * U
+            with np.errstate(divide="ignore", invalid="ignore"):
+                P_adj = np.where(total > 0, (raw + s * V) / total, raw / weight_sum)
+            abs_adj_sum[:, j] += np.abs(np.clip(P_adj, 0.0, 1.0) - yc).sum(axis=0)
+
+    # Expected calibration error: count-weighted |mean predicted - observed|
+    # per bin, i.e. sum over bins of |sum(p) - sum(y)| / N.
+    ece = np.abs(bin_p - bin_y).reshape(m, bins).sum(axis=1) / max(n, 1)
+
+    return {
+        "mae": abs_sum / max(n, 1),
+        "rmse": np.sqrt(sq_sum / max(n, 1)),
+        "bias": err_sum / max(n, 1),
+        "ece": ece,
+        "mae_adjusted": abs_adj_sum / max(n, 1),
+    }
+
+
+def tune(
+    path: str = DB_PATH,
+    step: float = GRID_STEP,
+    k_values: Sequence[float] = K_VALUES,
+    rank_by: str = "mae",
+    top: int = 20,
+    save: bool = False,
+    activate_best: bool = False,
+) -> Dict[str, Any]:
+    """
+    Evaluates the whole grid and returns the top candidates ranked by
+    rank_by (mae, rmse, ece or mae_adjusted). With save, the best one is
+    stored as a new model_weights version.
+    """
+    ensure_schema(path)
+    ModelStore(path).sync()
+    pool = get_pool(path)
+    started = time.perf_counter()
+
+    with pool.connection() as conn:
+        X, y = load_training_set(conn)
+    loaded = time.perf_counter()
+
+    W = simplex_grid(step)
+    k_values = np.asarray(k_values, dtype=np.float64)
+    metrics = evaluate(X, y, W, k_values)
+    scored = time.perf_counter()
+
+    # One candidate per (weights, K) pair; K only affects mae_adjusted.
+    kn = k_values.shape[0]
+    table = {name: np.repeat(metrics[name], kn) for name in ("mae", "rmse", "bias", "ece")}
+    table["mae_adjusted"] = metrics["mae_adjusted"].ravel()
+    if rank_by not in table:
+        raise ValueError(f"Unknown metric: {rank_by}")
+    order = np.lexsort((table["mae_adjusted"], table["mae"], table[rank_by]))
+
+    ranked: List[Dict[str, Any]] = []
+    for rank, c in enumerate(order[:top], start=1):
+        i, j = divmod(int(c), kn)
+        ranked.append({
+            "rank": rank,
+            "weights": {key: float(W[d, i]) for d, key in enumerate(WEIGHT_KEYS)},
+            "k": float(k_values[j]),
+            "mae": float(table["mae"][c]),
+            "rmse": float(table["rmse"][c]),
+            "bias": float(table["bias"][c]),
+            "ece": float(table["ece"][c]),
+            "mae_adjusted": float(table["mae_adjusted"][c]),
+        })
+
+    saved_version: Optional[int] = None
+    if save and ranked:
+        best = ranked[0]
+        with pool.transaction() as conn:
+            saved_version = save_weights(
+                conn, best["weights"], best["k"], source="grid_search",
+                samples=X.shape[0], mae=best["mae"], rmse=best["rmse"],
+            )
+            if activate_best:
+                activate(conn, saved_version)
+
+    return {
+        "samples": int(X.shape[0]),
+        "candidates": int(W.shape[1] * kn),
+        "ranked": ranked,
+        "saved_version": saved_version,
+        "load_s": loaded - started,
+        "score_s": scored - loaded,
+    }